@@ -0,0 +1,223 @@
+import argparse
+import logging
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import simplejson
+from dirbalak import config
+from dirbalak import repomirrorcache
+from dirbalak import traverse
+from dirbalak import traversefilter
+from dirbalak import traversefilterreachable
+from dirbalak import dependencygraph
+from dirbalak import makefiletricks
+from dirbalak.benchmark import syntheticmultiverse
+from dirbalak.rackrun import jobqueue
+from dirbalak.rackrun import solventofficiallabels
+from dirbalak.rackrun import traversefilterbuildbanned
+from upseto import gitwrapper
+
+logging.basicConfig(level=logging.WARNING)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repos", type=int, default=200)
+parser.add_argument("--fanOut", type=int, default=4, help="maximum non hub requirements of each repo")
+parser.add_argument(
+    "--staleness", type=float, default=0.3,
+    help="probability of a requirement being pinned to a commit older than master")
+parser.add_argument("--hubs", type=int, default=3, help="number of libraries every repo requires")
+parser.add_argument("--historyLength", type=int, default=5, help="commits in the history of each repo")
+parser.add_argument("--buildBannedRatio", type=float, default=0.05)
+parser.add_argument("--builtRatio", type=float, default=0.5)
+parser.add_argument("--makefileTargets", type=int, default=500)
+parser.add_argument("--repetitions", type=int, default=5)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument(
+    "--realGitRepos", action="store_true",
+    help="create the repos as local git repositories and traverse them through real repo mirrors")
+parser.add_argument("--output", default="benchmark.json")
+parser.add_argument("--compare", help="results file of a previous run to compare against")
+args = parser.parse_args()
+
+
+class _Project:
+    def __init__(self, buildBanned):
+        self._buildBanned = buildBanned
+
+    def buildBanned(self):
+        return self._buildBanned
+
+    def buildRootFS(self):
+        return None
+
+
+class _Multiverse:
+    def __init__(self, gitURLs, randomInstance):
+        self.projects = {
+            gitwrapper.originURLBasename(gitURL): _Project(
+                "benchmark" if randomInstance.random() < args.buildBannedRatio else None)
+            for gitURL in gitURLs}
+        self.traverseInstance = None
+
+    def getTraverse(self):
+        return self.traverseInstance
+
+
+class _SolventOfficialLabels:
+    labels = set()
+
+    def __init__(self, officialObjectStore):
+        pass
+
+    def built(self, basename, hash):
+        return (basename, hash) in self.labels
+
+    def builtMany(self, pairs):
+        return set(pairs) & self.labels
+
+    def generation(self):
+        return 0
+
+    def markBuilt(self, basename, hash):
+        self.labels.add((basename, hash))
+
+
+def _measure(results, name, callback):
+    durations = []
+    for repetition in xrange(args.repetitions):
+        before = time.time()
+        callback()
+        durations.append(time.time() - before)
+    ordered = sorted(durations)
+    results[name] = dict(
+        first=durations[0], minimum=ordered[0], median=ordered[len(ordered) / 2],
+        mean=sum(durations) / len(durations))
+    print "%-30s median %10.6f seconds" % (name, results[name]['median'])
+
+
+def _traverseAll(gitURLs):
+    result = traverse.Traverse()
+    for gitURL in gitURLs:
+        result.traverse(gitURL, 'origin/master')
+    return result
+
+
+def _reachableFromAll(dependencies, gitURLs):
+    result = traversefilterreachable.TraverseFilterReachable(dependencies)
+    for gitURL in gitURLs:
+        result.includeRecursiveByExactHashes(gitURL, 'origin/master')
+    return result.dependencies()
+
+
+def _buildBannedFiltered(multiverse, traverseInstance):
+    filter = traversefilterbuildbanned.TraverseFilterBuildBanned(multiverse, traverseInstance.index())
+    return filter.dependencies()
+
+
+def _buildNext(queue):
+    job = queue.next()
+    if job is not None:
+        queue.done(job, True)
+
+
+def _writeMakefile(directory):
+    lines = ["all: target0", "submit:", "approve:", "racktest:"]
+    for i in xrange(args.makefileTargets):
+        dependencies = " ".join("target%d" % j for j in xrange(i + 1, min(i + 4, args.makefileTargets)))
+        lines.append("target%d: %s" % (i, dependencies))
+        lines.append("\techo target%d" % i)
+    with open(os.path.join(directory, "Makefile"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.STDOUT).strip()
+    except:
+        return None
+
+
+def _compare(results, filename):
+    with open(filename) as f:
+        previous = simplejson.load(f)
+    print "Compared to %s (%s):" % (filename, previous['revision'])
+    for name, result in sorted(results.iteritems()):
+        if name not in previous['results']:
+            continue
+        before = previous['results'][name]['median']
+        print "%-30s %10.6f -> %10.6f seconds (x%.2f)" % (
+            name, before, result['median'], before / result['median'] if result['median'] else 0)
+
+
+def main():
+    temporary = tempfile.mkdtemp()
+    try:
+        randomInstance = random.Random(args.seed)
+        urlPrefix = "https://github.com/synthetic/"
+        if args.realGitRepos:
+            urlPrefix = "file://%s/origins/" % temporary
+        multiverse = syntheticmultiverse.SyntheticMultiverse(
+            repos=args.repos, fanOut=args.fanOut, staleness=args.staleness, hubs=args.hubs,
+            historyLength=args.historyLength, urlPrefix=urlPrefix, seed=args.seed)
+        if args.realGitRepos:
+            config.REPO_MIRRORS_BASEDIR = os.path.join(temporary, "repomirrors")
+            config.MANIFEST_STORE_FILENAME = os.path.join(temporary, "manifests.sqlite")
+            multiverse.createGitRepos()
+            repomirrorcache.prepopulate(multiverse.gitURLs)
+        else:
+            multiverse.installFakeMirrors()
+        _SolventOfficialLabels.labels = set(
+            (gitwrapper.originURLBasename(gitURL), hash)
+            for gitURL in multiverse.gitURLs for hash in multiverse.history[gitURL]
+            if randomInstance.random() < args.builtRatio)
+        solventofficiallabels.SolventOfficialLabels = _SolventOfficialLabels
+        standIn = _Multiverse(multiverse.gitURLs, randomInstance)
+        results = dict()
+
+        _measure(results, "traverse", lambda: _traverseAll(multiverse.gitURLs))
+        traverseInstance = _traverseAll(multiverse.gitURLs)
+        standIn.traverseInstance = traverseInstance
+        _measure(results, "dependencyTableIterate", lambda: list(traverseInstance.dependencies()))
+        _measure(results, "traverseFilter", lambda: traversefilter.TraverseFilter(
+            traverseInstance, solventRootFSArcs=False).dependencies())
+        filtered = traversefilter.TraverseFilter(traverseInstance, solventRootFSArcs=False).dependencies()
+        _measure(results, "traverseFilterReachable", lambda: _reachableFromAll(filtered, multiverse.gitURLs))
+        _measure(
+            results, "traverseFilterBuildBanned", lambda: _buildBannedFiltered(standIn, traverseInstance))
+        queue = jobqueue.JobQueue(None, standIn)
+        _measure(results, "jobQueueRecalculate", queue.recalculate)
+        if sum(len(jobs) for jobs in queue.queue().values()) > 0:
+            _measure(results, "jobQueueDone", lambda: _buildNext(queue))
+        else:
+            print "%-30s skipped, no queued jobs" % "jobQueueDone"
+        _measure(results, "dependencyGraphMakeGraph", lambda: dependencygraph.DependencyGraph(
+            filtered, lambda gitURL: dict()).makeGraph())
+        graph = dependencygraph.DependencyGraph(filtered, lambda gitURL: dict()).makeGraph()
+        _measure(results, "graphDotContents", graph._dotContents)
+        makefileDirectory = os.path.join(temporary, "makefile")
+        os.makedirs(makefileDirectory)
+        _writeMakefile(makefileDirectory)
+        _measure(results, "makefiletricks", lambda: makefiletricks.checkMakefileForErrors(
+            makefileDirectory, "Makefile"))
+
+        output = dict(
+            revision=_revision(), time=time.time(), parameters=vars(args),
+            sizes=dict(
+                repos=len(multiverse.gitURLs), dependencies=len(traverseInstance.dependencies()),
+                filteredDependencies=len(filtered),
+                queued=sum(len(jobs) for jobs in queue.queue().values()),
+                cantBeBuilt=len(queue.cantBeBuilt())),
+            results=results)
+        with open(args.output, "w") as f:
+            simplejson.dump(output, f, indent=4, sort_keys=True)
+        if args.compare is not None:
+            _compare(results, args.compare)
+    finally:
+        shutil.rmtree(temporary, ignore_errors=True)
+
+
+main()
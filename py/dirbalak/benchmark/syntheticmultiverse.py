@@ -0,0 +1,145 @@
+from dirbalak import repomirrorcache
+import subprocess
+import random
+import os
+import yaml
+
+_BASE_TIMESTAMP = 1400000000
+_COMMIT_INTERVAL = 60 * 60
+
+
+class SyntheticMultiverse:
+    def __init__(self, repos, fanOut, staleness, hubs, historyLength, urlPrefix, seed=0):
+        self._random = random.Random(seed)
+        self._fanOut = fanOut
+        self._staleness = staleness
+        self.historyLength = historyLength
+        self.gitURLs = ["%srepo%04d" % (urlPrefix, i) for i in xrange(repos)]
+        self.hubs = set(self.gitURLs[len(self.gitURLs) - hubs:])
+        self.requirements = dict()
+        for index, gitURL in enumerate(self.gitURLs):
+            for age in xrange(historyLength):
+                self.requirements[(gitURL, age)] = self._pickRequirements(index)
+        self.history = {
+            gitURL: ["%040x" % self._random.getrandbits(160) for age in xrange(historyLength)]
+            for gitURL in self.gitURLs}
+
+    def installFakeMirrors(self):
+        for gitURL in self.gitURLs:
+            repomirrorcache._cache[gitURL] = FakeMirror(self, gitURL)
+
+    def createGitRepos(self):
+        for gitURL in reversed(self.gitURLs):
+            self.history[gitURL] = self._createGitRepo(gitURL)
+
+    def _pickRequirements(self, index):
+        candidates = [url for url in self.gitURLs[index + 1:] if url not in self.hubs]
+        count = min(len(candidates), self._random.randint(0, self._fanOut))
+        chosen = self._random.sample(candidates, count)
+        chosen += [hub for hub in sorted(self.hubs) if hub != self.gitURLs[index]]
+        result = []
+        for gitURL in chosen:
+            stale = self._random.random() < self._staleness and self.historyLength > 1
+            age = self._random.randint(1, self.historyLength - 1) if stale else 0
+            type = 'upseto' if self._random.random() < 0.5 else 'solvent'
+            result.append((gitURL, age, type))
+        return result
+
+    def _createGitRepo(self, gitURL):
+        directory = gitURL[len("file://"):]
+        os.makedirs(directory)
+        _git(["init", "--quiet"], directory)
+        hashes = []
+        for age in reversed(xrange(self.historyLength)):
+            requirements = self.requirements[(gitURL, age)]
+            for type in ['upseto', 'solvent']:
+                with open(os.path.join(directory, type + ".manifest"), "w") as f:
+                    f.write(_manifestContents([
+                        (url, self.history[url][requirementAge])
+                        for url, requirementAge, requirementType in requirements
+                        if requirementType == type]))
+            _git(["add", "upseto.manifest", "solvent.manifest"], directory)
+            _git(
+                ["commit", "--quiet", "--allow-empty", "-m", "age %d" % age], directory,
+                timestamp=_BASE_TIMESTAMP - age * _COMMIT_INTERVAL)
+            hashes.insert(0, _git(["rev-parse", "HEAD"], directory).strip())
+        return hashes
+
+
+def _git(args, directory, timestamp=_BASE_TIMESTAMP):
+    date = "%d +0000" % timestamp
+    environment = dict(
+        os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date,
+        GIT_AUTHOR_NAME="benchmark", GIT_AUTHOR_EMAIL="benchmark@localhost",
+        GIT_COMMITTER_NAME="benchmark", GIT_COMMITTER_EMAIL="benchmark@localhost")
+    return subprocess.check_output(["git"] + args, cwd=directory, env=environment, close_fds=True)
+
+
+def _manifestContents(requirements):
+    return yaml.dump(
+        dict(requirements=[dict(originURL=url, hash=hash) for url, hash in requirements]),
+        default_flow_style=False)
+
+
+class _Manifest:
+    def __init__(self, requirements):
+        self._requirements = requirements
+
+    def requirements(self):
+        return self._requirements
+
+
+class _DirbalakManifest:
+    def buildRootFSRepositoryBasename(self):
+        raise KeyError("buildRootFSRepositoryBasename")
+
+
+class FakeMirror:
+    def __init__(self, multiverse, gitURL):
+        self._multiverse = multiverse
+        self._gitURL = gitURL
+        self._ages = {hash: age for age, hash in enumerate(multiverse.history[gitURL])}
+        self._ages['origin/master'] = 0
+
+    def gitURL(self):
+        return self._gitURL
+
+    def hash(self, branch):
+        assert branch == 'origin/master'
+        return self._multiverse.history[self._gitURL][0]
+
+    def branchName(self, hash):
+        return 'origin/master' if self._ages.get(hash, None) == 0 else hash
+
+    def hashExists(self, hash):
+        return hash in self._ages
+
+    def upsetoManifest(self, hash):
+        return self._manifest(hash, 'upseto')
+
+    def solventManifest(self, hash):
+        return self._manifest(hash, 'solvent')
+
+    def dirbalakManifest(self, hash):
+        return _DirbalakManifest()
+
+    def commitTimestamp(self, hash):
+        return _BASE_TIMESTAMP - self._ages[hash] * _COMMIT_INTERVAL
+
+    def distanceFromMaster(self, hash):
+        age = self._ages.get(hash, None)
+        if age == 0:
+            return None
+        if age is None:
+            return dict(broken=True)
+        return dict(broken=False, commits=age, time=age * _COMMIT_INTERVAL)
+
+    def distancesFromMaster(self, hashes):
+        return {hash: self.distanceFromMaster(hash) for hash in hashes}
+
+    def _manifest(self, hash, type):
+        history = self._multiverse.history
+        return _Manifest([
+            dict(originURL=url, hash=history[url][age])
+            for url, age, requirementType in self._multiverse.requirements[(self._gitURL, self._ages[hash])]
+            if requirementType == type])
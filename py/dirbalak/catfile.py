@@ -0,0 +1,87 @@
+import subprocess
+import threading
+import logging
+
+
+class CatFile:
+    def __init__(self, directory):
+        self._batchCheck = _Batch(directory, "--batch-check")
+        self._batch = _Batch(directory, "--batch")
+
+    def close(self):
+        self._batchCheck.close()
+        self._batch.close()
+
+    def hash(self, objectName):
+        header = self._batchCheck.request(objectName)
+        if header is None:
+            return None
+        return header[0]
+
+    def contents(self, objectName):
+        header = self._batch.request(objectName)
+        if header is None:
+            return None
+        return header[3]
+
+
+class _Batch:
+    def __init__(self, directory, mode):
+        self._directory = directory
+        self._mode = mode
+        self._lock = threading.Lock()
+        self._popen = None
+
+    def close(self):
+        with self._lock:
+            self._terminate()
+
+    def request(self, objectName):
+        if "\n" in objectName:
+            raise Exception("Invalid git object name '%s'" % objectName)
+        with self._lock:
+            if self._popen is None:
+                self._start()
+            try:
+                return self._request(objectName)
+            except:
+                logging.exception("git cat-file %(mode)s failed in '%(directory)s', restarting it", dict(
+                    mode=self._mode, directory=self._directory))
+                self._terminate()
+                raise
+
+    def _request(self, objectName):
+        self._popen.stdin.write(objectName + "\n")
+        self._popen.stdin.flush()
+        line = self._popen.stdout.readline()
+        if not line.endswith("\n"):
+            raise Exception("git cat-file %s terminated unexpectedly" % self._mode)
+        parts = line.rstrip("\n").split(" ")
+        if len(parts) != 3:
+            return None
+        hash, type, size = parts
+        size = int(size)
+        if self._mode != "--batch":
+            return hash, type, size
+        contents = self._popen.stdout.read(size)
+        if len(contents) != size or self._popen.stdout.read(1) != "\n":
+            raise Exception("Short read of '%s' from git cat-file %s" % (objectName, self._mode))
+        return hash, type, size, contents
+
+    def _start(self):
+        with open("/dev/null", "w") as devNull:
+            self._popen = subprocess.Popen(
+                ["git", "cat-file", self._mode], cwd=self._directory, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=devNull, close_fds=True)
+
+    def _terminate(self):
+        if self._popen is None:
+            return
+        try:
+            self._popen.stdin.close()
+            if self._popen.poll() is None:
+                self._popen.kill()
+            self._popen.wait()
+        except:
+            logging.exception("Unable to terminate git cat-file %(mode)s", dict(mode=self._mode))
+        self._popen = None
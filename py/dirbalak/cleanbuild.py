@@ -119,11 +119,9 @@ class CleanBuild:
         run.run(["sudo", "solvent", "fulfillrequirements"], cwd=self._git.directory())
 
     def _cloneSources(self):
-        logging.info("Cloning git repo inside chroot")
-        self._mirror.replicate(config.BUILD_DIRECTORY)
-        git = gitwrapper.GitWrapper.existing(self._gitURL, config.BUILD_DIRECTORY)
-        git.checkout(self._hash)
-        return git
+        logging.info("Staging git repo inside chroot")
+        self._mirror.stage(config.BUILD_DIRECTORY, self._hash)
+        return gitwrapper.GitWrapper.existing(self._gitURL, config.BUILD_DIRECTORY)
 
     def _upsetoCheckRequirements(self):
         if not os.path.exists(os.path.join(self._git.directory(), "upseto.manifest")):
@@ -6,6 +6,12 @@ else:
     DIRBALAK_DIR = os.path.join(os.environ['HOME'], ".dirbalak")
 REPO_MIRRORS_BASEDIR = os.path.join(DIRBALAK_DIR, "repomirrors")
 REPO_MIRRORS_LOCKFILE = os.path.join(REPO_MIRRORS_BASEDIR, "lock")
+BARE_REPO_MIRRORS = False
+PARTIAL_CLONE_REPO_MIRRORS = False
+READ_MANIFESTS_FROM_GIT_OBJECTS = True
+MANIFEST_STORE_FILENAME = os.path.join(DIRBALAK_DIR, "manifests.sqlite")
+TRAVERSE_SNAPSHOT_FILENAME = os.path.join(DIRBALAK_DIR, "traverse.snapshot")
+LABEL_INDEX_TIME_TO_LIVE = 60
 
 BUILD_CHROOT = os.path.join(DIRBALAK_DIR, "chroot")
 BUILD_DIRECTORY = os.path.join(BUILD_CHROOT, "home", "dirbalak")
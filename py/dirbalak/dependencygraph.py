@@ -21,17 +21,35 @@ class DependencyGraph:
             self._cachedGraph = self._makeGraph()
         return self._cachedGraph
 
+    def arcAttributes(self):
+        distances = self._distancesFromMaster()
+        return {
+            (dep.requiringURL, dep.gitURL, dep.hash, dep.type):
+                self._attributesFromDistanceFromMaster(distances[dep.gitURL][dep.hash])
+            for dep in self._dependencies
+            if dep.requiringURL is not None and dep.requiringURLHash == 'origin/master'}
+
     def _makeGraph(self):
         graphInstance = graph.Graph(dict(ranksep=0.7))
+        distances = self._distancesFromMaster()
         for dep in self._dependencies:
             self._addNodeToGraph(graphInstance, dep.gitURL)
             if dep.requiringURL is not None:
                 if dep.requiringURLHash != 'origin/master':
                     continue
                 self._addNodeToGraph(graphInstance, dep.requiringURL)
-                self._addArcToGraph(graphInstance, dep)
+                self._addArcToGraph(graphInstance, dep, distances[dep.gitURL][dep.hash])
         return graphInstance
 
+    def _distancesFromMaster(self):
+        hashes = dict()
+        for dep in self._dependencies:
+            if dep.requiringURL is not None and dep.requiringURLHash == 'origin/master':
+                hashes.setdefault(dep.gitURL, set()).add(dep.hash)
+        return {
+            gitURL: repomirrorcache.get(gitURL).distancesFromMaster(hashesOfGitURL)
+            for gitURL, hashesOfGitURL in hashes.iteritems()}
+
     def _lineStyleFromDependencyType(self, type):
         if type == 'upseto':
             return 'solid'
@@ -42,10 +60,8 @@ class DependencyGraph:
         else:
             raise AssertionError("Unknown type %s" % type)
 
-    def _addArcToGraph(self, graphInstance, dep):
+    def _addArcToGraph(self, graphInstance, dep, distance):
         basename = gitwrapper.originURLBasename(dep.gitURL)
-        mirror = repomirrorcache.get(dep.gitURL)
-        distance = mirror.distanceFromMaster(dep.hash)
         requiringBasename = gitwrapper.originURLBasename(dep.requiringURL)
         graphInstance.addArc(
             requiringBasename, basename, style=self._lineStyleFromDependencyType(dep.type),
@@ -0,0 +1,32 @@
+import array
+
+
+class DependencyIndex:
+    def __init__(self, dependencies):
+        self._dependencies = dependencies
+        self._byRequirer = dict()
+        self._byGitURL = dict()
+        self._byType = dict()
+        for index, dep in enumerate(dependencies):
+            requirer = dep.requiringURL, dep.requiringURLHash
+            self._byRequirer.setdefault(requirer, array.array('i')).append(index)
+            self._byGitURL.setdefault(dep.gitURL, array.array('i')).append(index)
+            self._byType.setdefault(dep.type, array.array('i')).append(index)
+
+    def dependencies(self):
+        return self._dependencies
+
+    def requirers(self):
+        return self._byRequirer.keys()
+
+    def dependenciesOf(self, requiringURL, requiringURLHash):
+        return self._rows(self._byRequirer.get((requiringURL, requiringURLHash), ()))
+
+    def dependentsOf(self, gitURL):
+        return self._rows(self._byGitURL.get(gitURL, ()))
+
+    def ofType(self, type):
+        return self._rows(self._byType.get(type, ()))
+
+    def _rows(self, indices):
+        return [self._dependencies[index] for index in indices]
@@ -0,0 +1,59 @@
+import array
+import itertools
+
+
+class DependencyTable:
+    def __init__(self, rowType):
+        self._rowType = rowType
+        self._values = []
+        self._valueIds = dict()
+        self._poolShared = False
+        self._columns = [array.array('i') for field in rowType._fields]
+
+    def append(self, row):
+        for column, value in zip(self._columns, row):
+            column.append(self._valueId(value))
+
+    def filter(self, predicate):
+        result = DependencyTable(self._rowType)
+        result._values = self._values
+        result._valueIds = self._valueIds
+        result._poolShared = True
+        self._poolShared = True
+        for index, row in enumerate(self):
+            if predicate(row):
+                for column, resultColumn in zip(self._columns, result._columns):
+                    resultColumn.append(column[index])
+        return result
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self)))]
+        return tuple.__new__(self._rowType, [self._values[column[index]] for column in self._columns])
+
+    def __iter__(self):
+        valueOf = self._values.__getitem__
+        for ids in itertools.izip(*self._columns):
+            yield tuple.__new__(self._rowType, map(valueOf, ids))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def _valueId(self, value):
+        key = (type(value), value)
+        if key not in self._valueIds:
+            if self._poolShared:
+                self._values = list(self._values)
+                self._valueIds = dict(self._valueIds)
+                self._poolShared = False
+            self._valueIds[key] = len(self._values)
+            self._values.append(value)
+        return self._valueIds[key]
@@ -2,8 +2,8 @@ from dirbalak import traverse
 from dirbalak import repomirrorcache
 from dirbalak import dependencygraph
 from dirbalak import traversefilter
+from dirbalak import labelindex
 from upseto import gitwrapper
-from upseto import run
 
 
 class Discover:
@@ -21,7 +21,9 @@ class Discover:
         filter = traversefilter.TraverseFilter(
             traverseInstance, dirbalakBuildRootFSArcs=dirbalakBuildRootFSArcs,
             solventRootFSArcs=solventRootFSArcs)
-        self._graph = dependencygraph.DependencyGraph(filter.dependencies(), self._nodeAttributes)
+        self._dependencies = filter.dependencies()
+        self._states = None
+        self._graph = dependencygraph.DependencyGraph(self._dependencies, self._nodeAttributes)
 
     def renderText(self):
         return self._graph.renderText()
@@ -44,15 +46,20 @@ class Discover:
     def _fillColor(self, mirror, basename):
         if self._objectStore is None:
             return {}
-        hash = mirror.hash('origin/master')
-        labelBase = 'solvent__%s__build__%s__' % (basename, hash)
-        labels = run.run([
-            'osmosis', 'listlabels', '^' + labelBase,
-            '--objectStores', self._objectStore]).strip().split("\n")
-        states = [label[len(labelBase):] for label in labels]
+        if self._states is None:
+            self._states = self._officialStates()
+        states = self._states[(basename, mirror.hash('origin/master'))]
         if 'official' in states:
             return dict()
         elif 'clean' in states:
             return dict(style="filled", color="#DDDDDD", peripheries=1)
         else:
             return dict(style="filled", color="#888888", peripheries=1, text_build="NOT BUILT")
+
+    def _officialStates(self):
+        gitURLs = set(dep.gitURL for dep in self._dependencies) | set(
+            dep.requiringURL for dep in self._dependencies if dep.requiringURL is not None)
+        pairs = [
+            (gitwrapper.originURLBasename(gitURL), repomirrorcache.get(gitURL).hash('origin/master'))
+            for gitURL in gitURLs]
+        return labelindex.get(self._objectStore).statesMany(pairs)
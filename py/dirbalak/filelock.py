@@ -1,6 +1,8 @@
 import fcntl
 import os
+import logging
 import contextlib
+import threading
 import time
 
 
@@ -11,24 +13,213 @@ class FileLock:
             os.makedirs(os.path.dirname(lockFile))
         self._lockFd = open(lockFile, "w")
         self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._sharedHolds = dict()
+        self._writer = None
+        self._writerDepth = 0
+        self._writersWaiting = 0
+        self._flocking = False
+        self._abandonedFlock = None
+        self._statistics = _statisticsOf(lockFile)
 
     @contextlib.contextmanager
-    def lock(self, timeout=30):
+    def lock(self, timeout=30, shared=False):
         before = time.time()
-        while time.time() - before < timeout:
-            if self._acquireAttempt():
-                yield
-                self._release()
+        try:
+            self._acquire(timeout, shared)
+        except:
+            self._statistics.timedOut()
+            raise
+        acquired = time.time()
+        self._statistics.acquired(shared, acquired - before)
+        try:
+            yield
+        finally:
+            self._release()
+            self._statistics.released(time.time() - acquired)
+
+    def _acquire(self, timeout, shared):
+        before = time.time()
+        thread = threading.current_thread().ident
+        with self._condition:
+            if self._writer == thread:
+                self._writerDepth += 1
                 return
-            time.sleep(0.1)
-        raise Exception("Timeout waiting for lock '%s' to free up" % self._lockFile)
+            if thread in self._sharedHolds:
+                if not shared:
+                    raise Exception("Can't upgrade a shared hold of lock '%s' to exclusive" % self._lockFile)
+                self._holdShared(thread)
+                return
+            if not shared:
+                self._writersWaiting += 1
+            try:
+                while not self._available(shared):
+                    self._condition.wait(self._remaining(before, timeout))
+            finally:
+                if not shared:
+                    self._writersWaiting -= 1
+                    self._condition.notify_all()
+            if self._readers > 0:
+                self._holdShared(thread)
+                return
+            self._flocking = True
+        try:
+            self._flock(shared, before, timeout)
+        except:
+            with self._condition:
+                if self._abandonedFlock is None:
+                    self._flocking = False
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._flocking = False
+            if shared:
+                self._holdShared(thread)
+            else:
+                self._writer = thread
+                self._writerDepth = 1
+            self._condition.notify_all()
 
-    def _acquireAttempt(self):
+    def _holdShared(self, thread):
+        self._readers += 1
+        self._sharedHolds[thread] = self._sharedHolds.get(thread, 0) + 1
+
+    def _remaining(self, before, timeout):
+        if timeout is None:
+            return None
+        remaining = timeout - (time.time() - before)
+        if remaining <= 0:
+            self._raiseTimeout()
+        return remaining
+
+    def _available(self, shared):
+        if self._flocking or self._writer is not None:
+            return False
+        if shared:
+            return self._writersWaiting == 0
+        return self._readers == 0
+
+    def _release(self):
+        thread = threading.current_thread().ident
+        with self._condition:
+            if self._writer == thread:
+                self._writerDepth -= 1
+                if self._writerDepth > 0:
+                    return
+                self._writer = None
+            else:
+                self._readers -= 1
+                self._sharedHolds[thread] -= 1
+                if self._sharedHolds[thread] == 0:
+                    del self._sharedHolds[thread]
+            if self._readers == 0 and self._writer is None:
+                fcntl.flock(self._lockFd, fcntl.LOCK_UN)
+            self._condition.notify_all()
+
+    def _flock(self, shared, before, timeout):
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if timeout is None:
+            fcntl.flock(self._lockFd, operation)
+            return
+        if self._acquireAttempt(operation):
+            return
+        outcome = dict()
+        flocker = threading.Thread(target=self._blockingFlock, args=(operation, outcome))
+        flocker.daemon = True
+        flocker.start()
+        with self._condition:
+            while 'acquired' not in outcome:
+                try:
+                    remaining = self._remaining(before, timeout)
+                except:
+                    self._abandonedFlock = outcome
+                    raise
+                self._condition.wait(remaining)
+        if not outcome['acquired']:
+            raise Exception("Unable to lock '%s'" % self._lockFile)
+
+    def _blockingFlock(self, operation, outcome):
         try:
-            fcntl.flock(self._lockFd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(self._lockFd, operation)
+            acquired = True
+        except:
+            logging.exception("Unable to lock '%(lockFile)s'", dict(lockFile=self._lockFile))
+            acquired = False
+        with self._condition:
+            outcome['acquired'] = acquired
+            if self._abandonedFlock is outcome:
+                if acquired:
+                    fcntl.flock(self._lockFd, fcntl.LOCK_UN)
+                self._abandonedFlock = None
+                self._flocking = False
+            self._condition.notify_all()
+
+    def _acquireAttempt(self, operation):
+        try:
+            fcntl.flock(self._lockFd, operation | fcntl.LOCK_NB)
             return True
         except IOError:
             return False
 
-    def _release(self):
-        fcntl.flock(self._lockFd, fcntl.LOCK_UN)
+    def _raiseTimeout(self):
+        raise Exception("Timeout waiting for lock '%s' to free up" % self._lockFile)
+
+
+class _Statistics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acquisitions = 0
+        self._sharedAcquisitions = 0
+        self._timeouts = 0
+        self._totalWait = 0.0
+        self._maximumWait = 0.0
+        self._totalHold = 0.0
+        self._maximumHold = 0.0
+        self._holders = dict()
+
+    def acquired(self, shared, wait):
+        holder = threading.current_thread().name
+        with self._lock:
+            self._acquisitions += 1
+            if shared:
+                self._sharedAcquisitions += 1
+            self._totalWait += wait
+            self._maximumWait = max(self._maximumWait, wait)
+            self._holders[holder] = self._holders.get(holder, 0) + 1
+
+    def released(self, hold):
+        holder = threading.current_thread().name
+        with self._lock:
+            self._totalHold += hold
+            self._maximumHold = max(self._maximumHold, hold)
+            self._holders[holder] -= 1
+            if self._holders[holder] == 0:
+                del self._holders[holder]
+
+    def timedOut(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def asDict(self):
+        with self._lock:
+            return dict(
+                acquisitions=self._acquisitions, sharedAcquisitions=self._sharedAcquisitions,
+                timeouts=self._timeouts, totalWait=self._totalWait, maximumWait=self._maximumWait,
+                totalHold=self._totalHold, maximumHold=self._maximumHold,
+                holders=sorted(self._holders.keys()))
+
+
+_registry = dict()
+_registryLock = threading.Lock()
+
+
+def _statisticsOf(lockFile):
+    with _registryLock:
+        return _registry.setdefault(lockFile, _Statistics())
+
+
+def statistics():
+    with _registryLock:
+        registry = dict(_registry)
+    return {lockFile: lockStatistics.asDict() for lockFile, lockStatistics in registry.iteritems()}
@@ -0,0 +1,97 @@
+import solvent.label
+from upseto import run
+import threading
+import logging
+import time
+import re
+from dirbalak import config
+
+
+_indices = {}
+_indicesLock = threading.Lock()
+
+
+def get(objectStore):
+    with _indicesLock:
+        if objectStore not in _indices:
+            _indices[objectStore] = LabelIndex(objectStore)
+        return _indices[objectStore]
+
+
+class LabelIndex:
+    def __init__(self, objectStore, timeToLive=None):
+        self._objectStore = objectStore
+        self._timeToLive = config.LABEL_INDEX_TIME_TO_LIVE if timeToLive is None else timeToLive
+        self._labelRegex = solvent.label.label(basename="(.*)", product="build", hash="(.*)", state="(.*)$")
+        self._regex = re.compile(self._labelRegex)
+        self._lock = threading.Lock()
+        self._states = None
+        self._refreshed = None
+        self._generation = 0
+
+    def built(self, basename, hash, refresh=True):
+        assert 'master' not in hash
+        return 'official' in self.states(basename, hash, refresh)
+
+    def builtMany(self, pairs, refresh=True):
+        for basename, hash in pairs:
+            assert 'master' not in hash
+        states = self.statesMany(pairs, refresh)
+        return set(pair for pair in states if 'official' in states[pair])
+
+    def states(self, basename, hash, refresh=True):
+        return self.statesMany([(basename, hash)], refresh)[(basename, hash)]
+
+    def statesMany(self, pairs, refresh=True):
+        with self._lock:
+            if refresh:
+                self._refreshIfStale()
+            states = dict() if self._states is None else self._states
+            return {pair: set(states.get(pair, ())) for pair in pairs}
+
+    def add(self, basename, hash, state):
+        with self._lock:
+            if self._states is None:
+                self._states = dict()
+            self._states.setdefault((basename, hash), set()).add(state)
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def invalidate(self):
+        with self._lock:
+            self._refreshed = None
+
+    def refreshIfStale(self):
+        with self._lock:
+            self._refreshIfStale()
+
+    def _refreshIfStale(self):
+        if self._refreshed is not None and time.time() - self._refreshed < self._timeToLive:
+            return
+        try:
+            states = self._list()
+        except:
+            if self._states is None:
+                raise
+            logging.exception("Unable to list labels of %(objectStore)s, keeping the previous index", dict(
+                objectStore=self._objectStore))
+            return
+        if states != self._states:
+            self._generation += 1
+        self._states = states
+        self._refreshed = time.time()
+
+    def _list(self):
+        labels = run.run([
+            'osmosis', 'listlabels', self._labelRegex,
+            '--objectStores', self._objectStore]).strip().split("\n")
+        states = dict()
+        for label in labels:
+            match = self._regex.match(label)
+            if match is None:
+                continue
+            basename, hash, state = match.groups()
+            states.setdefault((basename, hash), set()).add(state)
+        return states
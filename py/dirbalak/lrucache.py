@@ -0,0 +1,97 @@
+import collections
+import threading
+import time
+
+
+_Entry = collections.namedtuple("_Entry", "value negative expires size")
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(
+            self, maximumValues=100, maximumBytes=None, sizeOf=None, timeToLive=None,
+            negativeTimeToLive=None):
+        assert maximumBytes is None or sizeOf is not None, "Limiting bytes requires a sizeOf callback"
+        self._maximumValues = maximumValues
+        self._maximumBytes = maximumBytes
+        self._sizeOf = sizeOf
+        self._timeToLive = timeToLive
+        self._negativeTimeToLive = negativeTimeToLive
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._negativeHits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                self._misses += 1
+                return default
+            if entry.expires is not None and entry.expires <= time.time():
+                self._bytes -= entry.size
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._cache[key] = entry
+            self._hits += 1
+            if entry.negative:
+                self._negativeHits += 1
+            return entry.value
+
+    def set(self, key, value, negative=False):
+        timeToLive = self._timeToLive
+        if negative and self._negativeTimeToLive is not None:
+            timeToLive = self._negativeTimeToLive
+        expires = None if timeToLive is None else time.time() + timeToLive
+        size = 0 if self._sizeOf is None else self._sizeOf(value)
+        with self._lock:
+            self._discard(key)
+            self._cache[key] = _Entry(value=value, negative=negative, expires=expires, size=size)
+            self._bytes += size
+            while len(self._cache) > self._maximumValues or \
+                    (self._maximumBytes is not None and self._bytes > self._maximumBytes):
+                oldestKey, oldest = self._cache.popitem(last=False)
+                self._bytes -= oldest.size
+                self._evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def discardNegative(self):
+        with self._lock:
+            for key in [key for key, entry in self._cache.iteritems() if entry.negative]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def statistics(self):
+        with self._lock:
+            return dict(
+                values=len(self._cache), bytes=self._bytes, hits=self._hits,
+                negativeHits=self._negativeHits, misses=self._misses, evictions=self._evictions,
+                expirations=self._expirations)
+
+    def getter(self, getter, limitKeys=lambda x: True, isNegative=lambda value: False):
+        def _get(key):
+            if not limitKeys(key):
+                return getter(key)
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = getter(key)
+                self.set(key, value, negative=isNegative(value))
+            return value
+        return _get
+
+    def _discard(self, key):
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
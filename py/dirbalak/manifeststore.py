@@ -0,0 +1,54 @@
+from dirbalak import config
+import sqlite3
+import threading
+import os
+
+
+class ManifestStore:
+    _TIMEOUT = 30
+
+    def __init__(self, filename):
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, timeout=self._TIMEOUT, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS manifests ("
+                "gitURL TEXT NOT NULL, hash TEXT NOT NULL, filename TEXT NOT NULL, contents BLOB, "
+                "PRIMARY KEY (gitURL, hash, filename))")
+            self._connection.commit()
+
+    def get(self, gitURL, hash, filename):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT contents FROM manifests WHERE gitURL = ? AND hash = ? AND filename = ?",
+                (gitURL, hash, filename)).fetchone()
+        if row is None:
+            raise KeyError("Manifest '%s' of '%s'/%s not in store" % (filename, gitURL, hash))
+        return None if row[0] is None else str(row[0])
+
+    def set(self, gitURL, hash, filename, contents):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO manifests (gitURL, hash, filename, contents) VALUES (?, ?, ?, ?)",
+                (gitURL, hash, filename, None if contents is None else sqlite3.Binary(contents)))
+            self._connection.commit()
+
+    def known(self, gitURL, hash):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM manifests WHERE gitURL = ? AND hash = ? LIMIT 1", (gitURL, hash)).fetchone()
+        return row is not None
+
+
+_instance = None
+_instanceLock = threading.Lock()
+
+
+def instance():
+    global _instance
+    with _instanceLock:
+        if _instance is None:
+            _instance = ManifestStore(config.MANIFEST_STORE_FILENAME)
+    return _instance
@@ -1,9 +1,15 @@
 import logging
+import time
 
 
 class BuildState:
+    _DEFAULT_DURATION = 10 * 60
+    _DURATION_SMOOTHING = 0.5
+
     def __init__(self):
         self._jobs = dict()
+        self._started = dict()
+        self._durations = dict()
 
     def get(self, gitURL, hash):
         assert hash != 'origin/master'
@@ -17,6 +23,7 @@ class BuildState:
         value = dict(self.get(gitURL, hash))
         value['inProgress'] = True
         self._jobs[(gitURL, hash)] = value
+        self._started[(gitURL, hash)] = time.time()
         logging.info("Job %(gitURL)s/%(hash)s now in progress", dict(gitURL=gitURL, hash=hash))
 
     def done(self, gitURL, hash, success):
@@ -28,4 +35,16 @@ class BuildState:
         else:
             value['failures'] += 1
         self._jobs[(gitURL, hash)] = value
+        started = self._started.pop((gitURL, hash), None)
+        if success and started is not None:
+            self._recordDuration(gitURL, time.time() - started)
         logging.info("Job %(gitURL)s/%(hash)s no longer in progress", dict(gitURL=gitURL, hash=hash))
+
+    def duration(self, gitURL):
+        return self._durations.get(gitURL, self._DEFAULT_DURATION)
+
+    def _recordDuration(self, gitURL, duration):
+        if gitURL in self._durations:
+            duration = self._DURATION_SMOOTHING * duration + \
+                (1 - self._DURATION_SMOOTHING) * self._durations[gitURL]
+        self._durations[gitURL] = duration
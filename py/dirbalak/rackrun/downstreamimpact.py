@@ -0,0 +1,59 @@
+import collections
+
+
+class DownstreamImpact:
+    def __init__(self, cantBeBuilt, duration):
+        self._duration = duration
+        self._unblocks = dict()
+        self._requirements = dict()
+        for key, unbuiltRequirements in cantBeBuilt.iteritems():
+            for requirement in unbuiltRequirements:
+                requirementKey = (requirement['basename'], requirement['hash'])
+                self._unblocks.setdefault(requirementKey, set()).add(key)
+                self._requirements.setdefault(key, set()).add(requirementKey)
+        self._chains = dict()
+
+    def rank(self, key):
+        return (-self.chain(key), -self.blocked(key))
+
+    def blocked(self, key):
+        reached = set([key])
+        worklist = collections.deque([key])
+        while len(worklist) > 0:
+            for unblocked in self._unblocks.get(worklist.popleft(), ()):
+                if unblocked not in reached:
+                    reached.add(unblocked)
+                    worklist.append(unblocked)
+        return len(reached) - 1
+
+    def upstream(self, keys):
+        reached = set(keys)
+        worklist = collections.deque(reached)
+        while len(worklist) > 0:
+            for requirement in self._requirements.get(worklist.popleft(), ()):
+                if requirement not in reached:
+                    reached.add(requirement)
+                    worklist.append(requirement)
+        return reached
+
+    def chain(self, key):
+        visiting = set()
+        stack = [(key, False)]
+        while len(stack) > 0:
+            current, expanded = stack.pop()
+            if current in self._chains:
+                continue
+            if expanded:
+                visiting.discard(current)
+                self._chains[current] = max([0] + [
+                    self._duration(unblocked) + self._chains.get(unblocked, 0)
+                    for unblocked in self._unblocks.get(current, ())])
+                continue
+            if current in visiting:
+                continue
+            visiting.add(current)
+            stack.append((current, True))
+            for unblocked in self._unblocks.get(current, ()):
+                if unblocked not in self._chains and unblocked not in visiting:
+                    stack.append((unblocked, False))
+        return self._chains[key]
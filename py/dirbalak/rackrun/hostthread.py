@@ -10,9 +10,8 @@ from dirbalak.server import tojs
 class HostThread(threading.Thread):
     _DIE_AFTER_FAILES = 8
 
-    def __init__(self, jobQueue, jobQueueLock, host, removeCallback, jobDoneCallback):
+    def __init__(self, jobQueue, host, removeCallback, jobDoneCallback):
         self._jobQueue = jobQueue
-        self._jobQueueLock = jobQueueLock
         self._host = host
         self._removeCallback = removeCallback
         self._jobDoneCallback = jobDoneCallback
@@ -68,8 +67,7 @@ class HostThread(threading.Thread):
         self._host.close()
 
     def _buildOne(self):
-        with self._jobQueueLock:
-            job = self._jobQueue.next()
+        job = self._jobQueue.next()
         if job is None:
             time.sleep(15)
             return
@@ -83,16 +81,14 @@ class HostThread(threading.Thread):
                 buildRootFS=job['buildRootFS'], logbeamBuildID=buildID)
         except:
             logging.exception("Job failed: '%(job)s'", dict(job=job))
-            with self._jobQueueLock:
-                self._jobQueue.done(job, False)
+            self._jobQueue.done(job, False)
             tojs.appendEvent(self._hostEventsKey, dict(type="text", text="Job failed"))
             self._projectEvent(job, buildID, "build_failed")
             successful = False
             return traceback.format_exc()
         else:
             logging.info("Job succeeded: '%(job)s'", dict(job=job))
-            with self._jobQueueLock:
-                self._jobQueue.done(job, True)
+            self._jobQueue.done(job, True)
             self._projectEvent(job, buildID, "build_succeeded")
             tojs.appendEvent(self._hostEventsKey, dict(type="text", text="Job succeeded"))
             successful = True
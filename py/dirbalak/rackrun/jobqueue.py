@@ -2,10 +2,12 @@ from upseto import gitwrapper
 from dirbalak.rackrun import solventofficiallabels
 from dirbalak.rackrun import buildstate
 from dirbalak.rackrun import traversefilterbuildbanned
-from dirbalak import repomirrorcache
+from dirbalak.rackrun import jobscheduler
+from dirbalak.rackrun import downstreamimpact
 from dirbalak.server import tojs
-import collections
+import threading
 import logging
+import collections
 
 
 class JobQueue:
@@ -13,130 +15,206 @@ class JobQueue:
     MASTERS_NOT_BUILT = 2
     MASTERS_WHICH_BUILD_ONLY_FAILED = 3
     MASTERS_REBUILD = 4
+    _PUBLISH_DELAY = 1
 
     def __init__(self, officialObjectStore, multiverse):
         self._officialObjectStore = officialObjectStore
         self._multiverse = multiverse
         self._buildState = buildstate.BuildState()
-        self._queue = dict()
-        self._reversedMap = dict()
-        self._cantBeBuilt = dict()
-        self._rotation = {
-            self.NON_MASTER_DEPENDENCIES: 0,
-            self.MASTERS_NOT_BUILT: 0,
-            self.MASTERS_WHICH_BUILD_ONLY_FAILED: 0,
-            self.MASTERS_REBUILD: 0}
-        self._interPriorityRotation = [
+        self._scheduler = jobscheduler.JobScheduler([
             self.NON_MASTER_DEPENDENCIES, self.MASTERS_NOT_BUILT,
-            self.MASTERS_WHICH_BUILD_ONLY_FAILED, self.MASTERS_REBUILD]
+            self.MASTERS_WHICH_BUILD_ONLY_FAILED, self.MASTERS_REBUILD])
+        self._cantBeBuilt = dict()
+        self._labels = None
+        self._labelsGeneration = None
+        self._candidates = dict()
+        self._publishTimer = None
+        self._lock = threading.Lock()
 
     def next(self):
-        self._interPriorityRotation.append(self._interPriorityRotation.pop(0))
-        for key in self._interPriorityRotation:
-            for job in self._queue.get(key, []):
-                if not job['inProgress']:
-                    job['inProgress'] = True
-                    self._buildState.inProgress(job['gitURL'], job['hexHash'])
-                    self._rotateQueueByOne(self._queue, key)
-                    self._toJS()
-                    return job
+        with self._lock:
+            job = self._scheduler.next()
+            if job is None:
+                return None
+            job['inProgress'] = True
+            self._buildState.inProgress(job['gitURL'], job['hexHash'])
+            self._schedulePublish()
+            return job
 
     def done(self, job, success):
-        self._buildState.done(job['gitURL'], job['hexHash'], success)
-        self.recalculate()
+        with self._lock:
+            self._buildState.done(job['gitURL'], job['hexHash'], success)
+            mustRecalculate = self._labels is None
+            if not mustRecalculate:
+                self._done(job, success)
+        if mustRecalculate:
+            self.recalculate()
 
     def queue(self):
-        return self._queue
+        with self._lock:
+            return self._scheduler.queue()
 
     def cantBeBuilt(self):
-        return self._cantBeBuilt
+        with self._lock:
+            return dict(self._cantBeBuilt)
 
-    def recalculate(self):
+    def recalculate(self, diff=None):
         labels = solventofficiallabels.SolventOfficialLabels(self._officialObjectStore)
-        self._reversedMap = dict()
-        self._cantBeBuilt = dict()
+        candidates = self._calculateCandidates()
+        with self._lock:
+            incremental = diff is not None and self._labels is not None and \
+                labels.generation() == self._labelsGeneration
+            self._labels = labels
+            self._labelsGeneration = labels.generation()
+            if incremental:
+                affected = self._affectedByDiff(diff, candidates)
+            else:
+                self._scheduler.clear()
+                self._cantBeBuilt = dict()
+                affected = candidates.keys()
+            self._candidates = candidates
+            self._replace(affected)
+            self._rerank()
+        self._publish()
+
+    def _done(self, job, success):
+        if success and job['submit']:
+            self._labels.markBuilt(job['basename'], job['hexHash'])
+        affected = set(key for key in self._candidates if key[0] == job['basename'])
+        for key, unbuiltRequirements in self._cantBeBuilt.iteritems():
+            if job['basename'] in [requirement['basename'] for requirement in unbuiltRequirements]:
+                affected.add(key)
+        reranked = self._impact().upstream(affected)
+        self._replace(affected)
+        impact = self._impact()
+        reranked |= impact.upstream(affected)
+        self._scheduler.rerank(impact.rank, reranked)
+        self._schedulePublish()
+
+    def _calculateCandidates(self):
+        candidates = collections.OrderedDict()
         filtered = traversefilterbuildbanned.TraverseFilterBuildBanned(
-            self._multiverse,
-            self._multiverse.getTraverse().dependencies())
+            self._multiverse, self._multiverse.getTraverse().index())
         for dep in filtered.dependencies():
             basename = gitwrapper.originURLBasename(dep.gitURL)
             if basename not in self._multiverse.projects:
                 logging.info("Will not build project '%(project)s' not in the multiverse file", dict(
                     project=basename))
                 continue
-            project = self._multiverse.projects[basename]
-            hexHash = dep.hash if dep.hash != 'origin/master' else dep.masterHash
-            projectDict = dict(
-                basename=basename, hash=dep.hash, gitURL=dep.gitURL, submit=False,
-                hexHash=hexHash, buildRootFS=project.buildRootFS())
-            buildState = self._buildState.get(dep.gitURL, hexHash)
-            projectDict.update(buildState)
-            unbuiltRequirements = self._unbuiltRequirements(dep.gitURL, dep.hash, labels)
-            if unbuiltRequirements:
-                self._cantBeBuilt[(basename, dep.hash)] = unbuiltRequirements
-                continue
-            if project.buildBanned():
-                logging.info(
-                    "Will not put project '%(project)s' in queue, is build banned '%(message)s'",
-                    dict(project=basename, message=project.buildBanned()))
-                continue
-            if dep.hash == "origin/master":
-                mirror = repomirrorcache.get(dep.gitURL)
-                if labels.built(basename, mirror.hash('origin/master')):
-                    self._put(projectDict, self.MASTERS_REBUILD)
-                else:
-                    if buildState['failures'] > 0 and buildState['successes'] == 0:
-                        projectDict['submit'] = True
-                        self._put(projectDict, self.MASTERS_WHICH_BUILD_ONLY_FAILED)
-                    else:
-                        projectDict['submit'] = True
-                        self._put(projectDict, self.MASTERS_NOT_BUILT)
+            candidates.setdefault((basename, dep.hash), []).append(dep)
+        return candidates
+
+    def _affectedByDiff(self, diff, candidates):
+        changedGitURLs = set(diff.changedMasterHashes())
+        for edge in diff.addedEdges() + diff.removedEdges():
+            changedGitURLs.add(edge.gitURL)
+            changedGitURLs.add(edge.requiringURL)
+        for gitURL, hash in diff.broke() + diff.repaired():
+            changedGitURLs.add(gitURL)
+        changedBasenames = set(gitwrapper.originURLBasename(gitURL) for gitURL in changedGitURLs)
+        affected = set(
+            key for key in set(candidates) | set(self._candidates)
+            if key[0] in changedBasenames or candidates.get(key) != self._candidates.get(key))
+        index = self._multiverse.getTraverse().index()
+        for gitURL in changedGitURLs:
+            for dep in index.dependentsOf(gitURL):
+                if dep.requiringURL is not None:
+                    affected.add((gitwrapper.originURLBasename(dep.requiringURL), dep.requiringURLHash))
+        return [key for key in self._candidates if key in affected and key not in candidates] + \
+            [key for key in candidates if key in affected]
+
+    def _replace(self, keys):
+        deps = [dep for key in keys for dep in self._candidates.get(key, [])]
+        built = self._builtOf(deps)
+        for key in keys:
+            self._scheduler.remove(key)
+            self._cantBeBuilt.pop(key, None)
+        for dep in deps:
+            self._place(dep, built)
+
+    def _builtOf(self, deps):
+        index = self._multiverse.getTraverse().index()
+        pairs = set()
+        for dep in deps:
+            for candidate in [dep] + list(index.dependenciesOf(dep.gitURL, dep.hash)):
+                hexHash = candidate.hash if candidate.hash != 'origin/master' else candidate.masterHash
+                pairs.add((gitwrapper.originURLBasename(candidate.gitURL), hexHash))
+        return self._labels.builtMany(pairs)
+
+    def _place(self, dep, built):
+        basename = gitwrapper.originURLBasename(dep.gitURL)
+        project = self._multiverse.projects[basename]
+        hexHash = dep.hash if dep.hash != 'origin/master' else dep.masterHash
+        projectDict = dict(
+            basename=basename, hash=dep.hash, gitURL=dep.gitURL, submit=False,
+            hexHash=hexHash, buildRootFS=project.buildRootFS())
+        buildState = self._buildState.get(dep.gitURL, hexHash)
+        projectDict.update(buildState)
+        unbuiltRequirements = self._unbuiltRequirements(dep.gitURL, dep.hash, built)
+        if unbuiltRequirements:
+            self._cantBeBuilt[(basename, dep.hash)] = unbuiltRequirements
+            return
+        if project.buildBanned():
+            logging.info(
+                "Will not put project '%(project)s' in queue, is build banned '%(message)s'",
+                dict(project=basename, message=project.buildBanned()))
+            return
+        if dep.hash == "origin/master":
+            if (basename, dep.masterHash) in built:
+                self._put(projectDict, self.MASTERS_REBUILD)
             else:
-                if not labels.built(basename, dep.hash):
+                if buildState['failures'] > 0 and buildState['successes'] == 0:
+                    projectDict['submit'] = True
+                    self._put(projectDict, self.MASTERS_WHICH_BUILD_ONLY_FAILED)
+                else:
                     projectDict['submit'] = True
-                    projectDict['requiringBasename'] = gitwrapper.originURLBasename(dep.requiringURL)
-                    self._put(projectDict, self.NON_MASTER_DEPENDENCIES)
-        self._reverseMap()
-        self._toJS()
-
-    def _toJS(self):
-        tojs.set('queue/queue', self._queue)
-        tojs.set('queue/cantBeBuilt', [
-            dict(basename=basename, hash=hash, unbuiltRequirements=unbuiltRequirements)
-            for (basename, hash), unbuiltRequirements in self._cantBeBuilt.iteritems()])
-
-    def _unbuiltRequirements(self, gitURL, hash, labels):
+                    self._put(projectDict, self.MASTERS_NOT_BUILT)
+        else:
+            if (basename, dep.hash) not in built:
+                projectDict['submit'] = True
+                projectDict['requiringBasename'] = gitwrapper.originURLBasename(dep.requiringURL)
+                self._put(projectDict, self.NON_MASTER_DEPENDENCIES)
+
+    def _rerank(self):
+        self._scheduler.rerank(self._impact().rank)
+
+    def _impact(self):
+        return downstreamimpact.DownstreamImpact(self._cantBeBuilt, self._duration)
+
+    def _duration(self, key):
+        return self._buildState.duration(self._candidates[key][0].gitURL)
+
+    def _schedulePublish(self):
+        if self._publishTimer is not None:
+            return
+        self._publishTimer = threading.Timer(self._PUBLISH_DELAY, self._publish)
+        self._publishTimer.daemon = True
+        self._publishTimer.start()
+
+    def _publish(self):
+        with self._lock:
+            self._publishTimer = None
+            queue = {
+                priority: [dict(job) for job in jobs]
+                for priority, jobs in self._scheduler.queue().iteritems()}
+            cantBeBuilt = [
+                dict(basename=basename, hash=hash, unbuiltRequirements=list(unbuiltRequirements))
+                for (basename, hash), unbuiltRequirements in self._cantBeBuilt.iteritems()]
+        tojs.set('queue/queue', queue)
+        tojs.set('queue/cantBeBuilt', cantBeBuilt)
+
+    def _unbuiltRequirements(self, gitURL, hash, built):
         result = []
-        for dep in self._multiverse.getTraverse().dependencies():
-            if dep.requiringURL != gitURL or dep.requiringURLHash != hash:
-                continue
+        for dep in self._multiverse.getTraverse().index().dependenciesOf(gitURL, hash):
             basename = gitwrapper.originURLBasename(dep.gitURL)
-            mirror = repomirrorcache.get(dep.gitURL)
-            hexHash = dep.hash if dep.hash != 'origin/master' else mirror.hash('origin/master')
-            if not labels.built(basename, hexHash):
+            hexHash = dep.hash if dep.hash != 'origin/master' else dep.masterHash
+            if (basename, hexHash) not in built:
                 result.append(dict(basename=basename, hash=dep.hash))
         return result
 
-    def _reverseMap(self):
-        queue = dict()
-        for priority, project in self._reversedMap.values():
-            queue.setdefault(priority, []).append(project)
-        for key in queue:
-            deque = collections.deque(queue[key])
-            deque.rotate(self._rotation[key])
-            queue[key] = list(deque)
-        self._queue = queue
-
-    def _rotateQueueByOne(self, queue, key):
-        assert key in queue
-        self._rotation[key] -= 1
-        deque = collections.deque(queue[key])
-        deque.rotate(-1)
-        queue[key] = list(deque)
-
     def _put(self, project, priority):
         key = (project['basename'], project['hash'])
-        currentPriority = self._reversedMap.get(key, (10000, None))[0]
-        if currentPriority > priority:
+        currentPriority = self._scheduler.priority(key)
+        if currentPriority is None or currentPriority > priority:
             project['priority'] = priority
-            self._reversedMap[key] = (priority, project)
+            self._scheduler.put(key, priority, project)
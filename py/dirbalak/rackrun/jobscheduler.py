@@ -0,0 +1,69 @@
+import itertools
+import heapq
+
+
+class JobScheduler:
+    def __init__(self, priorities):
+        self._priorities = list(priorities)
+        self._counter = itertools.count()
+        self._sequences = dict()
+        self._previousSequences = dict()
+        self.clear()
+
+    def clear(self):
+        self._heaps = {priority: [] for priority in self._priorities}
+        self._entries = dict()
+        self._previousSequences = self._sequences
+        self._sequences = dict()
+
+    def priority(self, key):
+        entry = self._entries.get(key, None)
+        return None if entry is None else entry[0]
+
+    def put(self, key, priority, job):
+        if key not in self._sequences:
+            self._sequences[key] = self._previousSequences.get(key, None)
+            if self._sequences[key] is None:
+                self._sequences[key] = next(self._counter)
+        previous = self._entries.get(key, None)
+        rank = () if previous is None else previous[1]
+        self._entries[key] = (priority, rank, self._sequences[key], job)
+        self._push(key)
+
+    def remove(self, key):
+        self._entries.pop(key, None)
+
+    def rerank(self, rankOf, keys=None):
+        if keys is None:
+            keys = self._entries.keys()
+            self._heaps = {priority: [] for priority in self._priorities}
+        for key in keys:
+            if key not in self._entries:
+                continue
+            priority, rank, sequence, job = self._entries[key]
+            self._entries[key] = (priority, rankOf(key), sequence, job)
+            self._push(key)
+
+    def next(self):
+        self._priorities.append(self._priorities.pop(0))
+        for priority in self._priorities:
+            heap = self._heaps[priority]
+            while len(heap) > 0:
+                rank, sequence, key = heapq.heappop(heap)
+                entry = self._entries.get(key, None)
+                if entry is None or entry[:3] != (priority, rank, sequence) or entry[3]['inProgress']:
+                    continue
+                self._sequences[key] = next(self._counter)
+                return entry[3]
+        return None
+
+    def queue(self):
+        result = dict()
+        for priority, rank, sequence, job in sorted(self._entries.values(), key=lambda entry: entry[1:3]):
+            result.setdefault(priority, []).append(job)
+        return result
+
+    def _push(self, key):
+        priority, rank, sequence, job = self._entries[key]
+        if not job['inProgress']:
+            heapq.heappush(self._heaps[priority], (rank, sequence, key))
@@ -13,7 +13,6 @@ class Pool(threading.Thread):
     def __init__(self, jobQueue, jobDoneCallback):
         self._jobQueue = jobQueue
         self._jobDoneCallback = jobDoneCallback
-        self._jobQueueLock = threading.Lock()
         self._hostThreads = []
         threading.Thread.__init__(self)
         self.daemon = True
@@ -63,7 +62,7 @@ class Pool(threading.Thread):
             lastAllocationFailedException = None
             logging.info("Allocated a host")
             self._hostThreads.append(hostthread.HostThread(
-                self._jobQueue, self._jobQueueLock, host, self._remove, self._jobDoneCallback))
+                self._jobQueue, host, self._remove, self._jobDoneCallback))
         logging.warning("Pool loop exists (since connection to provider was interrupted)")
 
     def _connectionToProviderInterrupted(self):
@@ -1,23 +1,20 @@
-import solvent.label
-from upseto import run
-import re
+from dirbalak import labelindex
 
 
 class SolventOfficialLabels:
     def __init__(self, officialObjectStore):
-        self._officialObjectStore = officialObjectStore
-        labelRegex = solvent.label.label(basename="(.*)", product="build", hash="(.*)", state="official$")
-        regex = re.compile(labelRegex)
-        labels = run.run([
-            'osmosis', 'listlabels', labelRegex,
-            '--objectStores', self._officialObjectStore]).strip().split("\n")
-        if labels == [""]:
-            labels = []
-        self._labels = set()
-        for label in labels:
-            basename, hash = regex.match(label).groups()
-            self._labels.add((basename, hash))
+        self._index = labelindex.get(officialObjectStore)
+        self._index.refreshIfStale()
 
     def built(self, basename, hash):
+        return self._index.built(basename, hash, refresh=False)
+
+    def builtMany(self, pairs):
+        return self._index.builtMany(pairs, refresh=False)
+
+    def generation(self):
+        return self._index.generation()
+
+    def markBuilt(self, basename, hash):
         assert 'master' not in hash
-        return (basename, hash) in self._labels
+        self._index.add(basename, hash, 'official')
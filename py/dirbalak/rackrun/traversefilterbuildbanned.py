@@ -3,9 +3,10 @@ from dirbalak import traversefilterreachable
 
 
 class TraverseFilterBuildBanned:
-    def __init__(self, multiverse, dependencies):
+    def __init__(self, multiverse, index):
         self._multiverse = multiverse
-        self._dependencies = dependencies
+        self._index = index
+        self._banned = dict()
         self._filtered = self._filterOutBuildBanned()
         self._filter = traversefilterreachable.TraverseFilterReachable(self._filtered)
         self._roots = []
@@ -17,9 +18,14 @@ class TraverseFilterBuildBanned:
         return self._result
 
     def _filterOutBuildBanned(self):
-        return [dep for dep in self._dependencies if not self._gitURLBuildBanned(dep.requiringURL)]
+        return [dep for dep in self._index.dependencies() if not self._gitURLBuildBanned(dep.requiringURL)]
 
     def _gitURLBuildBanned(self, gitURL):
+        if gitURL not in self._banned:
+            self._banned[gitURL] = self._calculateGitURLBuildBanned(gitURL)
+        return self._banned[gitURL]
+
+    def _calculateGitURLBuildBanned(self, gitURL):
         if gitURL is None:
             return False
         basename = gitwrapper.originURLBasename(gitURL)
@@ -3,15 +3,26 @@ from upseto import run
 from dirbalak import config
 from dirbalak import filelock
 from dirbalak import manifest
-from dirbalak import lastvaluescache
+from dirbalak import manifeststore
+from dirbalak import catfile
+from dirbalak import lrucache
 import upseto.manifest
 import solvent.manifest
 import os
 import time
+import tempfile
+import shutil
+import subprocess
+import collections
 
 
 class RepoMirror:
     _LOCK_TIMEOUT = 2 * 60
+    _MANIFESTS_CACHE_SIZE = 1000
+    _HASH_EXISTS_CACHE_SIZE = 10000
+    _DISTANCES_CACHE_SIZE = 10000
+    _REMOTE_REFS_REFSPEC = "+refs/remotes/origin/*:refs/remotes/origin/*"
+    _SUDO = [] if os.getuid() == 0 else ["sudo"]
 
     def __init__(self, gitURL):
         self._gitURL = gitURL
@@ -20,67 +31,184 @@ class RepoMirror:
         self._cloneDirectory = os.path.join(config.REPO_MIRRORS_BASEDIR, self._identifier)
         self._lock = filelock.FileLock(self._cloneDirectory + ".lock")
         self._git = None
-        self._upsetoManifestsCache = lastvaluescache.LastValuesCache()
-        self._solventManifestsCache = lastvaluescache.LastValuesCache()
-        self._dirbalakManifestsCache = lastvaluescache.LastValuesCache()
-        self._hashExistsCache = lastvaluescache.LastValuesCache()
+        self._directory = None
+        self._bare = None
+        self._partial = None
+        self._catFile = None
+        self._upsetoManifestsCache = lrucache.LRUCache(self._MANIFESTS_CACHE_SIZE)
+        self._solventManifestsCache = lrucache.LRUCache(self._MANIFESTS_CACHE_SIZE)
+        self._dirbalakManifestsCache = lrucache.LRUCache(self._MANIFESTS_CACHE_SIZE)
+        self._hashExistsCache = lrucache.LRUCache(self._HASH_EXISTS_CACHE_SIZE)
+        self._distancesCache = lrucache.LRUCache(self._DISTANCES_CACHE_SIZE)
         self.upsetoManifest = self._upsetoManifestsCache.getter(
             self._upsetoManifestGetter, self._hashIsHex)
         self.solventManifest = self._solventManifestsCache.getter(
             self._solventManifestGetter, self._hashIsHex)
         self.dirbalakManifest = self._dirbalakManifestsCache.getter(
             self._dirbalakManifestGetter, self._hashIsHex)
+        self.hashExists = self._hashExistsCache.getter(
+            self._hashExistsGetter, isNegative=lambda exists: not exists)
 
     def gitURL(self):
         return self._gitURL
 
+    def cacheStatistics(self):
+        return dict(
+            upsetoManifests=self._upsetoManifestsCache.statistics(),
+            solventManifests=self._solventManifestsCache.statistics(),
+            dirbalakManifests=self._dirbalakManifestsCache.statistics(),
+            hashExists=self._hashExistsCache.statistics(),
+            distances=self._distancesCache.statistics())
+
     def existing(self):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
+        with self._lock.lock(timeout=self._LOCK_TIMEOUT, shared=True):
             if not os.path.isdir(self._cloneDirectory):
                 raise Exception("'%s' not cloned, can't assume existing" % self._gitURL)
-            self._git = gitwrapper.GitWrapper.existing(self._gitHTTPSURL, self._cloneDirectory)
+            self._attach()
 
     def fetch(self):
+        if os.path.isdir(self._cloneDirectory):
+            if self._directory is None:
+                self.existing()
+            if self._remoteRefsAlreadyFetched():
+                return False
         with self._lock.lock(timeout=self._LOCK_TIMEOUT):
             if os.path.isdir(self._cloneDirectory):
-                self._git = gitwrapper.GitWrapper.existing(self._gitHTTPSURL, self._cloneDirectory)
-                self._git.fetch()
+                self._attach()
+                if self._bare:
+                    self._runGit(["fetch", "--prune", "origin"])
+                else:
+                    self._git.fetch()
             else:
                 os.makedirs(self._cloneDirectory)
-                self._git = gitwrapper.GitWrapper.clone(self._gitHTTPSURL, self._cloneDirectory)
+                if config.BARE_REPO_MIRRORS:
+                    self._cloneBare()
+                elif config.PARTIAL_CLONE_REPO_MIRRORS:
+                    self._clonePartial()
+                else:
+                    gitwrapper.GitWrapper.clone(self._gitHTTPSURL, self._cloneDirectory)
+                self._attach()
+            self._catFile.close()
+            self._hashExistsCache.discardNegative()
+            self._distancesCache.discardNegative()
+        return True
+
+    def _remoteRefsAlreadyFetched(self):
+        PREFIX = "refs/remotes/origin/"
+        local = dict()
+        for line in self._runGit(["for-each-ref", "--format=%(objectname) %(refname)", PREFIX]).split("\n"):
+            if line.strip() == "":
+                continue
+            hash, ref = line.split(" ")
+            if ref != PREFIX + "HEAD":
+                local["refs/heads/" + ref[len(PREFIX):]] = hash
+        remote = dict()
+        for line in self._runGit(["ls-remote", "--heads", "origin"]).split("\n"):
+            if line.strip() == "":
+                continue
+            hash, ref = line.split("\t")
+            remote[ref] = hash
+        return local == remote
+
+    def _bareDirectory(self):
+        return os.path.join(self._cloneDirectory, gitwrapper.originURLBasename(self._gitHTTPSURL))
+
+    def _cloneBare(self):
+        directory = self._bareDirectory()
+        run.run(["git", "init", "--quiet", "--bare", directory])
+        run.run(["git", "remote", "add", "origin", self._gitHTTPSURL], cwd=directory)
+        run.run([
+            "git", "config", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*"], cwd=directory)
+        if config.PARTIAL_CLONE_REPO_MIRRORS:
+            run.run(["git", "fetch", "--filter=blob:none", "origin"], cwd=directory)
+            run.run(["git", "config", "uploadpack.allowFilter", "true"], cwd=directory)
+        else:
+            run.run(["git", "fetch", "origin"], cwd=directory)
+
+    def _clonePartial(self):
+        basename = gitwrapper.originURLBasename(self._gitHTTPSURL)
+        run.run([
+            "git", "clone", "--quiet", "--no-checkout", "--filter=blob:none", self._gitHTTPSURL, basename],
+            cwd=self._cloneDirectory)
+        run.run(
+            ["git", "config", "uploadpack.allowFilter", "true"],
+            cwd=os.path.join(self._cloneDirectory, basename))
+
+    def _attach(self):
+        self._bare = os.path.exists(os.path.join(self._bareDirectory(), "HEAD"))
+        if self._bare:
+            self._git = None
+            self._directory = self._bareDirectory()
+        else:
+            self._git = gitwrapper.GitWrapper.existing(self._gitHTTPSURL, self._cloneDirectory)
+            self._directory = self._git.directory()
+        self._partial = self._isPartial()
+        if self._catFile is None:
+            self._catFile = catfile.CatFile(self._directory)
+
+    def _isPartial(self):
+        try:
+            return self._runGit(["config", "--get", "remote.origin.promisor"]).strip() == "true"
+        except:
+            return False
+
+    def _runGit(self, args):
+        return run.run(["git"] + args, cwd=self._directory)
 
     def _upsetoManifestGetter(self, hash):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            self._git.checkout(hash)
-            return upseto.manifest.Manifest.fromDirOrNew(self._git.directory())
+        return self._manifest(upseto.manifest.Manifest, "upseto.manifest", hash)
 
     def _hashIsHex(self, hash):
         return len(hash) == 40
 
     def _solventManifestGetter(self, hash):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            self._git.checkout(hash)
-            return solvent.manifest.Manifest.fromDirOrNew(self._git.directory())
+        return self._manifest(solvent.manifest.Manifest, "solvent.manifest", hash)
 
     def _dirbalakManifestGetter(self, hash):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            self._git.checkout(hash)
-            return manifest.Manifest.fromDirOrNew(self._git.directory())
+        return self._manifest(manifest.Manifest, "dirbalak.manifest", hash)
+
+    def _manifest(self, manifestClass, filename, hash):
+        if not config.READ_MANIFESTS_FROM_GIT_OBJECTS and not self._bare:
+            with self._lock.lock(timeout=self._LOCK_TIMEOUT):
+                self._git.checkout(hash)
+                return manifestClass.fromDirOrNew(self._git.directory())
+        contents = self._manifestContents(filename, hash)
+        directory = tempfile.mkdtemp()
+        try:
+            if contents is not None:
+                with open(os.path.join(directory, filename), "w") as f:
+                    f.write(contents)
+            return manifestClass.fromDirOrNew(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _manifestContents(self, filename, hash):
+        if not self._hashIsHex(hash):
+            return self._manifestContentsFromGit(filename, hash)
+        store = manifeststore.instance()
+        try:
+            return store.get(self._gitURL, hash, filename)
+        except KeyError:
+            pass
+        contents = self._manifestContentsFromGit(filename, hash)
+        store.set(self._gitURL, hash, filename, contents)
+        return contents
+
+    def _manifestContentsFromGit(self, filename, hash):
+        if self._catFile.hash(hash + "^{commit}") is None:
+            raise Exception("No such commit '%s' in '%s'" % (hash, self._gitURL))
+        return self._catFile.contents("%s:%s" % (hash, filename))
 
     def hash(self, branch):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            return self._git.hash(branch)
+        result = self._catFile.hash(branch)
+        if result is None:
+            raise Exception("Unable to resolve '%s' in '%s'" % (branch, self._gitURL))
+        return result
 
-    def hashExists(self, branch):
-        if self._hashExistsCache.get(branch):
+    def _hashExistsGetter(self, branch):
+        if self._hashIsHex(branch) and manifeststore.instance().known(self._gitURL, branch):
             return True
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            try:
-                self._git.checkout(branch)
-                self._hashExistsCache.set(branch, True)
-                return True
-            except:
-                return False
+        return self._catFile.hash(branch + "^{commit}") is not None
 
     def branchName(self, hash):
         masterHash = self.hash('origin/master')
@@ -89,35 +217,186 @@ class RepoMirror:
         else:
             return hash
 
-    def replicate(self, destination):
+    def stage(self, destination, hash):
+        directory = os.path.join(destination, gitwrapper.originURLBasename(self._gitHTTPSURL))
+        if self._partial:
+            self._hydrate(hash)
+        with self._lock.lock(timeout=self._LOCK_TIMEOUT, shared=True):
+            if self._partial:
+                run.run(self._SUDO + ["git", "init", "--quiet", directory])
+                run.run(self._SUDO + ["git", "remote", "add", "origin", self._directory], cwd=directory)
+                run.run(self._SUDO + [
+                    "git", "fetch", "--quiet", "--filter=blob:none", "origin", self._REMOTE_REFS_REFSPEC],
+                    cwd=directory)
+            else:
+                run.run(self._SUDO + [
+                    "git", "clone", "--quiet", "--local", "--no-checkout", self._directory, directory])
+                run.run(
+                    self._SUDO + ["git", "fetch", "--quiet", "origin", self._REMOTE_REFS_REFSPEC],
+                    cwd=directory)
+        run.run(self._SUDO + ["git", "checkout", "--quiet", hash], cwd=directory)
+        run.run(self._SUDO + ["git", "remote", "set-url", "origin", self._gitHTTPSURL], cwd=directory)
+        return directory
+
+    def _hydrate(self, hash):
+        with self._lock.lock(timeout=self._LOCK_TIMEOUT, shared=True):
+            missing = self._missingObjects(hash)
+        if len(missing) == 0:
+            return
         with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            run.run(["sudo", "cp", "-a", self._cloneDirectory, destination + "/"])
+            popen = subprocess.Popen([
+                "git", "-c", "fetch.negotiationAlgorithm=noop", "fetch", "--quiet", "--no-tags",
+                "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+                "origin"],
+                cwd=self._directory, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, close_fds=True)
+            output = popen.communicate("\n".join(missing) + "\n")[0]
+        if popen.returncode != 0:
+            raise Exception("Unable to fetch contents of '%s' in '%s':\n%s" % (hash, self._gitURL, output))
+
+    def _missingObjects(self, hash):
+        objects = self._runGit(["rev-list", "--objects", "--missing=print", hash + "^{tree}"])
+        return [line[1:] for line in objects.split("\n") if line.startswith("?")]
 
     def run(self, command, hash):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            self._git.checkout(hash)
-            return run.run(command, cwd=self._git.directory())
+        if not self._bare:
+            with self._lock.lock(timeout=self._LOCK_TIMEOUT):
+                self._git.checkout(hash)
+                return run.run(command, cwd=self._git.directory())
+        if self._partial:
+            self._hydrate(hash)
+        with self._lock.lock(timeout=self._LOCK_TIMEOUT, shared=True):
+            worktree = tempfile.mkdtemp()
+            try:
+                self._runGit(["worktree", "add", "--detach", worktree, hash])
+                return run.run(command, cwd=worktree)
+            finally:
+                shutil.rmtree(worktree, ignore_errors=True)
+                self._runGit(["worktree", "prune"])
 
     def commitTimestamp(self, hash):
-        return int(self._git.run(['log', '-1', '--pretty=tformat:%at', hash]).strip())
+        commit = self._catFile.contents(hash + "^{commit}")
+        if commit is None:
+            raise Exception("No such commit '%s' in '%s'" % (hash, self._gitURL))
+        for line in commit.split("\n"):
+            if line.startswith("author "):
+                return int(line.rsplit(" ", 2)[1])
+            if line == "":
+                break
+        raise Exception("Commit '%s' in '%s' has no author line" % (hash, self._gitURL))
 
     def distanceFromMaster(self, hash):
-        with self._lock.lock(timeout=self._LOCK_TIMEOUT):
-            if hash == 'origin/master' or hash == self._git.hash('origin/master'):
-                return None
-            result = dict(broken=False)
-            try:
-                left, right = self._git.run(
-                    ['rev-list', '--count', '--left-right', '%s...origin/master' % hash]).strip().split('\t')
-                left, right = int(left), int(right)
-                result['commits'] = left + right
-                if right > 0:
-                    timeDeltaSeconds = time.time() - self.commitTimestamp('origin/master~%d' % (right - 1))
-                    if timeDeltaSeconds > 0:
-                        result['time'] = timeDeltaSeconds
-            except:
-                result['broken'] = True
-            return result
+        return self.distancesFromMaster([hash])[hash]
+
+    def distancesFromMaster(self, hashes):
+        masterHash = self.hash('origin/master')
+        result = dict()
+        distances = dict()
+        toCalculate = []
+        for hash in set(hashes):
+            if hash == 'origin/master' or hash == masterHash:
+                result[hash] = None
+                continue
+            distance = self._distancesCache.get((hash, masterHash)) if self._hashIsHex(hash) else None
+            if distance is None:
+                toCalculate.append(hash)
+            else:
+                distances[hash] = distance
+        if toCalculate:
+            distances.update(self._calculateDistancesFromMaster(toCalculate, masterHash))
+        now = time.time()
+        for hash, distance in distances.iteritems():
+            result[hash] = dict(broken=distance['broken'])
+            if 'commits' in distance:
+                result[hash]['commits'] = distance['commits']
+            if 'timestamp' in distance and now - distance['timestamp'] > 0:
+                result[hash]['time'] = now - distance['timestamp']
+        return result
+
+    def cachedDistancesFromMaster(self, hashes):
+        masterHash = self.hash('origin/master')
+        distances = dict()
+        for hash in hashes:
+            distance = self._distancesCache.get((hash, masterHash)) if self._hashIsHex(hash) else None
+            if distance is not None:
+                distances[hash] = distance
+        return dict(masterHash=masterHash, distances=distances)
+
+    def rememberDistancesFromMaster(self, masterHash, distances):
+        for hash, distance in distances.iteritems():
+            self._distancesCache.set((hash, masterHash), distance, negative=distance['broken'])
+
+    def _calculateDistancesFromMaster(self, hashes, masterHash):
+        result = dict()
+        resolved = dict()
+        for hash in hashes:
+            commit = self._catFile.hash(hash + "^{commit}")
+            if commit is None:
+                result[hash] = dict(broken=True)
+            else:
+                resolved[hash] = commit
+        if resolved:
+            result.update(self._distancesFromCommitGraph(resolved, masterHash))
+        for hash, distance in result.iteritems():
+            if self._hashIsHex(hash):
+                self._distancesCache.set((hash, masterHash), distance, negative=distance['broken'])
+        return result
+
+    def _distancesFromCommitGraph(self, resolved, masterHash):
+        tips = [masterHash] + sorted(set(resolved.values()) - set([masterHash]))
+        with self._lock.lock(timeout=self._LOCK_TIMEOUT, shared=True):
+            boundaries = self._commonAncestors(tips)
+            output = self._runGit(
+                ['log', '--topo-order', '--format=%H %at %P'] + tips + ['--not'] + boundaries)
+        bits = {tip: 1 << index for index, tip in enumerate(tips)}
+        masks = dict(bits)
+        parents = dict()
+        timestamps = dict()
+        reached = collections.Counter()
+        for line in output.strip().split("\n"):
+            if line == "":
+                continue
+            fields = line.split()
+            commit = fields[0]
+            timestamps[commit] = int(fields[1])
+            parents[commit] = fields[2:]
+            mask = masks.pop(commit, 0)
+            reached[mask] += 1
+            for parent in parents[commit]:
+                masks[parent] = masks.get(parent, 0) | mask
+        firstParentChain = []
+        commit = masterHash
+        while commit in parents:
+            firstParentChain.append(commit)
+            commit = parents[commit][0] if parents[commit] else None
+        result = dict()
+        for hash, commit in resolved.iteritems():
+            left = sum(count for mask, count in reached.iteritems() if mask & bits[commit] and not mask & 1)
+            right = sum(count for mask, count in reached.iteritems() if mask & 1 and not mask & bits[commit])
+            distance = dict(broken=False, commits=left + right)
+            if right > len(firstParentChain):
+                timestamp = self._masterAncestorTimestamp(masterHash, right - 1)
+                if timestamp is None:
+                    distance['broken'] = True
+                else:
+                    distance['timestamp'] = timestamp
+            elif right > 0:
+                distance['timestamp'] = timestamps[firstParentChain[right - 1]]
+            result[hash] = distance
+        return result
+
+    def _commonAncestors(self, commits):
+        try:
+            return self._runGit(['merge-base', '--all', '--octopus'] + commits).split()
+        except:
+            return []
+
+    def _masterAncestorTimestamp(self, masterHash, generation):
+        try:
+            ancestor = '%s~%d' % (masterHash, generation)
+            return int(self._runGit(['log', '-1', '--format=%at', ancestor]).strip())
+        except:
+            return None
 
     def _httpsURL(self, gitURL):
         PREFIX = "git@github.com:"
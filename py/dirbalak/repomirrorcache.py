@@ -1,9 +1,12 @@
 from dirbalak import repomirror
 import multiprocessing.pool
 import logging
+import threading
 
 
 _cache = {}
+_creationLocks = {}
+_creationLocksLock = threading.Lock()
 _CONCURRENCY = 32
 
 
@@ -12,17 +15,50 @@ fetch = True
 
 def get(gitURL):
     global _cache
-    if gitURL not in _cache:
-        mirror = repomirror.RepoMirror(gitURL)
-        if fetch:
-            logging.info("Fetching repo %(gitURL)s", dict(gitURL=gitURL))
-            mirror.fetch()
-        else:
-            mirror.existing()
-        _cache[gitURL] = mirror
+    if gitURL in _cache:
+        return _cache[gitURL]
+    with _creationLocksLock:
+        creationLock = _creationLocks.setdefault(gitURL, threading.Lock())
+    with creationLock:
+        if gitURL not in _cache:
+            mirror = repomirror.RepoMirror(gitURL)
+            if fetch:
+                logging.info("Fetching repo %(gitURL)s", dict(gitURL=gitURL))
+                mirror.fetch()
+            else:
+                mirror.existing()
+            _cache[gitURL] = mirror
     return _cache[gitURL]
 
 
+def attached(gitURL):
+    return gitURL in _cache
+
+
+def cacheStatistics():
+    result = dict()
+    for mirror in _cache.values():
+        for name, statistics in mirror.cacheStatistics().iteritems():
+            total = result.setdefault(name, dict())
+            for key, value in statistics.iteritems():
+                total[key] = total.get(key, 0) + value
+    return result
+
+
+def attachExisting(gitURLs):
+    global _cache
+    for url in gitURLs:
+        if url in _cache:
+            continue
+        mirror = repomirror.RepoMirror(url)
+        try:
+            mirror.existing()
+        except:
+            logging.info("No usable mirror of %(gitURL)s yet, will fetch on demand", dict(gitURL=url))
+            continue
+        _cache[url] = mirror
+
+
 def prepopulate(gitURLs):
     global _cache
     pool = multiprocessing.pool.ThreadPool(_CONCURRENCY)
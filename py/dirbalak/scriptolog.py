@@ -26,12 +26,7 @@ class Scriptolog:
         return "\n".join(script)
 
     def _dependsOn(self, gitURL):
-        for dep in self._traverse.dependencies():
-            if dep.requiringURL != gitURL:
-                continue
-            if dep.requiringURLHash != 'origin/master':
-                continue
-            yield dep
+        return self._traverse.index().dependenciesOf(gitURL, 'origin/master')
 
     def _updatedUpsetoManifest(self, dependsOn):
         if len([d for d in dependsOn if d.type == 'upseto']) == 0:
@@ -2,6 +2,9 @@ import threading
 import logging
 import Queue
 from dirbalak.server import suicide
+from dirbalak.server import tojs
+from dirbalak import repomirrorcache
+from dirbalak import filelock
 import multiprocessing.pool
 import time
 
@@ -15,6 +18,9 @@ class FetchThread(threading.Thread):
         self._queue = Queue.Queue()
         self._traverseNeeded = False
         self._hashes = dict()
+        self._changedGitURLs = set()
+        self._fetched = 0
+        self._unchanged = 0
         self._postTraverseCallbacks = []
         threading.Thread.__init__(self)
         self.daemon = True
@@ -33,14 +39,14 @@ class FetchThread(threading.Thread):
     def _fetchSubthread(self, mirror):
         logging.info("Fetching gitURL %(url)s", dict(url=mirror.gitURL()))
         try:
-            mirror.fetch()
+            fetched = mirror.fetch()
         except:
             logging.exception("Unable to fetch '%(url)s'", dict(url=mirror.gitURL()))
             time.sleep(10)
             self.enqueue(mirror)
             self._dequeued += 1
             return
-        self._queue.put(mirror)
+        self._queue.put((mirror, fetched))
 
     def addPostTraverseCallback(self, callback):
         self._postTraverseCallbacks.append(callback)
@@ -54,18 +60,40 @@ class FetchThread(threading.Thread):
             suicide.killSelf()
 
     def _work(self):
-        mirror = self._queue.get()
+        mirror, fetched = self._queue.get()
         self._dequeued += 1
+        if fetched:
+            self._fetched += 1
+        else:
+            logging.info("Remote refs of %(url)s unchanged, fetch skipped", dict(url=mirror.gitURL()))
+            self._unchanged += 1
         hash = mirror.hash('origin/master')
         if hash != self._hashes.get(mirror.gitURL(), None):
             self._traverseNeeded = True
+            self._changedGitURLs.add(mirror.gitURL())
+        elif fetched:
+            self._changedGitURLs.add(mirror.gitURL())
         self._hashes[mirror.gitURL()] = hash
         if self._traverseNeeded and self._dequeued == self._enqueued:
-            logging.info("Fetched all, starting traverse")
+            logging.info("Fetched all, starting traverse of %(changed)d changed repos", dict(
+                changed=len(self._changedGitURLs)))
             self._traverseNeeded = False
-            self._multiverse.traverse()
+            changedGitURLs = self._changedGitURLs
+            self._changedGitURLs = set()
+            diff = self._multiverse.traverse(changedGitURLs)
+            logging.info(
+                "Traverse done: %(added)d edges added, %(removed)d removed, %(masters)d masters moved", dict(
+                    added=len(diff.addedEdges()), removed=len(diff.removedEdges()),
+                    masters=len(diff.changedMasterHashes())))
+            tojs.set('traverse/changes', diff.asDict())
             for callback in self._postTraverseCallbacks:
-                callback()
+                callback(diff)
+            self._publishStatistics()
         else:
             logging.info("Still missing %(fetches)d fetches", dict(
                 fetches=self._enqueued - self._dequeued))
+
+    def _publishStatistics(self):
+        tojs.set('statistics/repoMirrorCaches', repomirrorcache.cacheStatistics())
+        tojs.set('statistics/fetches', dict(fetched=self._fetched, unchanged=self._unchanged))
+        tojs.set('statistics/locks', filelock.statistics())
@@ -10,17 +10,40 @@ import logging
 class GraphsResource(resource.Resource):
     def __init__(self, multiverse):
         resource.Resource.__init__(self)
+        self._multiverse = multiverse
+        self._nodeAttributes = None
+        self._arcAttributes = None
         self._allProjects = _AllProjects(multiverse)
         self._projectFolder = _ProjectFolder(multiverse)
         self.putChild("allProjects", self._allProjects)
         self.putChild("project", self._projectFolder)
 
-    def update(self):
+    def update(self, diff=None):
+        nodeAttributes = self._currentNodeAttributes()
+        arcAttributes = self._currentArcAttributes()
+        if diff is not None and diff.empty() and nodeAttributes == self._nodeAttributes and \
+                arcAttributes == self._arcAttributes:
+            logging.info("Traverse, node and arc attributes unchanged, graphs kept")
+            return
+        self._nodeAttributes = nodeAttributes
+        self._arcAttributes = arcAttributes
         self._allProjects.clearCache()
         self._projectFolder.clearCache()
         tojs.increment("graph/generation")
         logging.info("Graph must refresh")
 
+    def _currentNodeAttributes(self):
+        attributes = multiversegraphnodeattributes.MultiverseGraphNodeAttributes(self._multiverse).attributes
+        return {
+            basename: attributes(project.gitURL())
+            for basename, project in self._multiverse.projects.items()}
+
+    def _currentArcAttributes(self):
+        if self._multiverse.getTraverse() is None:
+            return None
+        return dependencygraph.DependencyGraph(
+            self._multiverse.getTraverse().dependencies(), lambda gitURL: dict()).arcAttributes()
+
 
 class _AllProjects(resource.Resource):
     def __init__(self, multiverse):
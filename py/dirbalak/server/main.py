@@ -2,6 +2,7 @@ import logging
 import argparse
 import realtimewebui.config
 from dirbalak.rackrun import config
+import dirbalak.config
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -19,9 +20,17 @@ parser.add_argument("--unsecured", action="store_true")
 parser.add_argument("--githubNetRCFile", required=True)
 parser.add_argument("--realtimewebuiRoot")
 parser.add_argument("--dirbalakRoot", default=".")
+parser.add_argument(
+    "--bareRepoMirrors", action="store_true",
+    help="keep newly cloned repository mirrors as bare repositories, without a working tree")
+parser.add_argument(
+    "--partialCloneRepoMirrors", action="store_true",
+    help="clone new repository mirrors without file contents, fetching blobs only when needed")
 args = parser.parse_args()
 
 config.GITHUB_NETRC_FILE = args.githubNetRCFile
+dirbalak.config.BARE_REPO_MIRRORS = args.bareRepoMirrors
+dirbalak.config.PARTIAL_CLONE_REPO_MIRRORS = args.partialCloneRepoMirrors
 if args.realtimewebuiRoot is not None:
     realtimewebui.config.REALTIMEWEBUI_ROOT_DIRECTORY = args.realtimewebuiRoot
 
@@ -37,9 +46,11 @@ from dirbalak.server import callbacks
 from dirbalak.server import spawngithubwebeventlistener
 from dirbalak.rackrun import jobqueue
 from dirbalak.server import scriptologresource
+from dirbalak.server import traversesnapshot
 from dirbalak.rackrun import pool
 from dirbalak import rackrun
 from dirbalak import repomirrorcache
+from dirbalak import labelindex
 from upseto import gitwrapper
 from twisted.web import static
 import logbeam.config
@@ -76,11 +87,22 @@ atexit.register(lambda *a: logbeamWebFrontend.terminate())
 fetchThread = fetchthread.FetchThread()
 with open(args.multiverseFile) as f:
     multiverseData = yaml.load(f.read())
+snapshot = traversesnapshot.load()
+if snapshot is None:
     repomirrorcache.prepopulate(p['gitURL'] for p in multiverseData['PROJECTS'])
+else:
+    logging.info("Warm starting from traverse snapshot, refreshing in the background")
+    repomirrorcache.attachExisting(
+        set(p['gitURL'] for p in multiverseData['PROJECTS']) |
+        set(dep.gitURL for dep in snapshot.traverse().dependencies()))
 multiverseInstance = multiverse.Multiverse.load(args.multiverseFile, fetchThread=fetchThread)
+if snapshot is not None:
+    multiverseInstance.restore(snapshot)
 fetchThread.start(multiverseInstance)
 callbacks.Callbacks(multiverseInstance)
 jobQueue = jobqueue.JobQueue(args.officialObjectStore, multiverseInstance)
+if snapshot is not None:
+    jobQueue.recalculate()
 fetchThread.addPostTraverseCallback(jobQueue.recalculate)
 graphResource = graphsresource.GraphsResource(multiverseInstance)
 
@@ -88,6 +110,7 @@ graphResource = graphsresource.GraphsResource(multiverseInstance)
 def reloadConfig(*ignored):
     logging.info("Received SIGHUP, rereading multiverse file")
     multiverseInstance.rereadMultiverseFile(args.multiverseFile)
+    labelindex.get(args.officialObjectStore).invalidate()
     jobQueue.recalculate()
 
 
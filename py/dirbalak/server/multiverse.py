@@ -1,13 +1,18 @@
 from dirbalak.server import project
+from dirbalak.server import traversesnapshot
 from dirbalak import traverse
+from dirbalak import traversediff
+from dirbalak import repomirrorcache
 from upseto import gitwrapper
 import yaml
+import logging
 
 
 class Multiverse:
     def __init__(self, fetchThread):
         self._fetchThread = fetchThread
         self.projects = dict()
+        self._traverse = None
 
     @classmethod
     def load(cls, filename, fetchThread):
@@ -15,12 +20,44 @@ class Multiverse:
         result.rereadMultiverseFile(filename)
         return result
 
-    def traverse(self):
-        self._traverse = traverse.Traverse()
+    def traverse(self, changedGitURLs):
+        previous = self._traverse
+        self._traverse = traverse.Traverse(previous=previous, changedGitURLs=changedGitURLs)
         for project in self.projects.values():
             self._traverse.traverse(project.gitURL(), 'origin/master')
+        distances = self._calculateDistancesFromMaster()
         for project in self.projects.values():
             project.setTraverse(self._traverse)
+        traversesnapshot.save(self._traverse, distances)
+        return traversediff.TraverseDiff(previous, self._traverse)
+
+    def restore(self, snapshot):
+        self._traverse = snapshot.traverse()
+        for gitURL, distances in snapshot.distancesFromMaster().iteritems():
+            if repomirrorcache.attached(gitURL):
+                repomirrorcache.get(gitURL).rememberDistancesFromMaster(
+                    distances['masterHash'], distances['distances'])
+        index = self._traverse.index()
+        for project in self.projects.values():
+            gitURLs = [project.gitURL()] + [
+                dep.gitURL for dep in index.dependenciesOf(project.gitURL(), 'origin/master')]
+            if all(repomirrorcache.attached(gitURL) for gitURL in gitURLs):
+                project.setTraverse(self._traverse)
+            else:
+                logging.info("Mirrors of '%(project)s' not attached, will publish after traverse", dict(
+                    project=project.basename()))
+
+    def _calculateDistancesFromMaster(self):
+        hashes = dict()
+        for dep in self._traverse.dependencies():
+            if dep.requiringURL is not None and dep.requiringURLHash == 'origin/master':
+                hashes.setdefault(dep.gitURL, set()).add(dep.hash)
+        result = dict()
+        for gitURL, hashesOfGitURL in hashes.iteritems():
+            mirror = repomirrorcache.get(gitURL)
+            mirror.distancesFromMaster(hashesOfGitURL)
+            result[gitURL] = mirror.cachedDistancesFromMaster(hashesOfGitURL)
+        return result
 
     def getTraverse(self):
         return self._traverse
@@ -73,11 +73,7 @@ class Project:
 
     def _dependsOn(self):
         result = []
-        for dep in self._traverse.dependencies():
-            if dep.requiringURL != self._gitURL:
-                continue
-            if dep.requiringURLHash != 'origin/master':
-                continue
+        for dep in self._traverse.index().dependenciesOf(self._gitURL, 'origin/master'):
             mirror = repomirrorcache.get(dep.gitURL)
             result.append(dict(
                 basename=gitwrapper.originURLBasename(dep.gitURL),
@@ -87,15 +83,15 @@ class Project:
         return result
 
     def _dependedBy(self):
+        dependedBy = [
+            dep for dep in self._traverse.index().dependentsOf(self._gitURL)
+            if dep.requiringURLHash == 'origin/master']
+        distances = self._mirror.distancesFromMaster([dep.hash for dep in dependedBy])
         result = []
-        for dep in self._traverse.dependencies():
-            if dep.gitURL != self._gitURL:
-                continue
-            if dep.requiringURLHash != 'origin/master':
-                continue
+        for dep in dependedBy:
             result.append(dict(
                 basename=gitwrapper.originURLBasename(dep.requiringURL),
                 hash=dep.hash,
-                distanceFromMaster=self._mirror.distanceFromMaster(dep.hash),
+                distanceFromMaster=distances[dep.hash],
                 type=dep.type))
         return result
@@ -0,0 +1,51 @@
+from dirbalak import traverse
+from dirbalak import config
+import simplejson
+import logging
+import os
+
+_VERSION = 2
+
+
+class Snapshot:
+    def __init__(self, traverseInstance, distancesFromMaster):
+        self._traverse = traverseInstance
+        self._distancesFromMaster = distancesFromMaster
+
+    def traverse(self):
+        return self._traverse
+
+    def distancesFromMaster(self):
+        return self._distancesFromMaster
+
+
+def save(traverseInstance, distancesFromMaster):
+    data = dict(
+        version=_VERSION, dependencies=[list(dep) for dep in traverseInstance.dependencies()],
+        distancesFromMaster=distancesFromMaster)
+    temporary = config.TRAVERSE_SNAPSHOT_FILENAME + ".tmp"
+    try:
+        with open(temporary, "w") as f:
+            simplejson.dump(data, f)
+        os.rename(temporary, config.TRAVERSE_SNAPSHOT_FILENAME)
+    except:
+        logging.exception("Unable to save traverse snapshot to '%(filename)s'", dict(
+            filename=config.TRAVERSE_SNAPSHOT_FILENAME))
+
+
+def load():
+    if not os.path.exists(config.TRAVERSE_SNAPSHOT_FILENAME):
+        return None
+    try:
+        with open(config.TRAVERSE_SNAPSHOT_FILENAME) as f:
+            data = simplejson.load(f)
+        if data['version'] != _VERSION:
+            logging.info("Ignoring traverse snapshot of version %(version)s", dict(version=data['version']))
+            return None
+        traverseInstance = traverse.Traverse.fromDependencies(
+            traverse.Dependency(*row) for row in data['dependencies'])
+        return Snapshot(traverseInstance, data['distancesFromMaster'])
+    except:
+        logging.exception("Unable to load traverse snapshot from '%(filename)s'", dict(
+            filename=config.TRAVERSE_SNAPSHOT_FILENAME))
+        return None
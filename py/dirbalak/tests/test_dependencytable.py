@@ -0,0 +1,55 @@
+import unittest
+from dirbalak import dependencytable
+from dirbalak import traverse
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.first = traverse.Dependency('project', 'origin/master', None, None, 'root', 'hash1', False)
+        self.second = traverse.Dependency(
+            'library', 'hash2', 'project', 'origin/master', 'upseto', 'hash3', True)
+        self.tested = dependencytable.DependencyTable(traverse.Dependency)
+        self.tested.append(self.first)
+        self.tested.append(self.second)
+
+    def test_RowsReadBackAsDependencies(self):
+        self.assertEquals(len(self.tested), 2)
+        self.assertEquals(self.tested[0], self.first)
+        self.assertEquals(self.tested[-1], self.second)
+        self.assertEquals(self.tested[1:], [self.second])
+        self.assertEquals(list(self.tested), [self.first, self.second])
+        self.assertEquals(self.tested, [self.first, self.second])
+        self.assertIn(self.second, self.tested)
+        self.assertIs(self.tested[1].broken, True)
+
+    def test_Filter(self):
+        filtered = self.tested.filter(lambda dep: dep.type == 'upseto')
+        self.assertEquals(filtered, [self.second])
+        filtered.append(self.first)
+        self.assertEquals(filtered, [self.second, self.first])
+        self.assertEquals(self.tested, [self.first, self.second])
+
+    def test_AppendingToFilteredTableLeavesSourcePoolIntact(self):
+        values = list(self.tested._values)
+        filtered = self.tested.filter(lambda dep: True)
+        filtered.append(self.first._replace(hash='hash4'))
+        self.assertEquals(self.tested._values, values)
+        self.tested.append(self.first._replace(hash='hash5'))
+        self.assertNotIn('hash5', filtered._values)
+        self.assertEquals(filtered[-1].hash, 'hash4')
+        self.assertEquals(self.tested[-1].hash, 'hash5')
+
+    def test_EqualValuesOfDifferentTypesKeepTheirType(self):
+        self.tested.append(self.first._replace(hash=1, masterHash=1.0, broken=1))
+        self.assertEquals(self.tested[2].broken, 1)
+        self.assertIs(type(self.tested[2].broken), int)
+        self.assertIs(type(self.tested[2].masterHash), float)
+        self.assertIs(self.tested[0].broken, False)
+        self.assertIs(self.tested[1].broken, True)
+
+    def test_Unhashable(self):
+        self.assertRaises(TypeError, hash, self.tested)
+
+
+if __name__ == '__main__':
+    unittest.main()
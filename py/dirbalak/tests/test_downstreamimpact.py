@@ -0,0 +1,69 @@
+import unittest
+from dirbalak.rackrun import downstreamimpact
+
+
+def requirements(*basenames):
+    return [dict(basename=basename, hash='hash') for basename in basenames]
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.durations = dict()
+
+    def duration(self, key):
+        return self.durations.get(key[0], 1)
+
+    def test_NothingBlocked(self):
+        tested = downstreamimpact.DownstreamImpact({}, self.duration)
+        self.assertEquals(tested.blocked(('lib', 'hash')), 0)
+        self.assertEquals(tested.chain(('lib', 'hash')), 0)
+        self.assertEquals(tested.rank(('lib', 'hash')), (0, 0))
+
+    def test_TransitivelyBlocked(self):
+        tested = downstreamimpact.DownstreamImpact({
+            ('middle', 'hash'): requirements('lib'),
+            ('app1', 'hash'): requirements('middle'),
+            ('app2', 'hash'): requirements('middle', 'lib'),
+            ('tool', 'hash'): requirements('other')}, self.duration)
+        self.assertEquals(tested.blocked(('lib', 'hash')), 3)
+        self.assertEquals(tested.chain(('lib', 'hash')), 2)
+        self.assertEquals(tested.blocked(('other', 'hash')), 1)
+        self.assertLess(tested.rank(('lib', 'hash')), tested.rank(('other', 'hash')))
+
+    def test_Upstream(self):
+        tested = downstreamimpact.DownstreamImpact({
+            ('middle', 'hash'): requirements('lib'),
+            ('app', 'hash'): requirements('middle'),
+            ('tool', 'hash'): requirements('other')}, self.duration)
+        self.assertEquals(tested.upstream([('app', 'hash')]), set([
+            ('app', 'hash'), ('middle', 'hash'), ('lib', 'hash')]))
+        self.assertEquals(tested.upstream([('other', 'hash')]), set([('other', 'hash')]))
+
+    def test_LongestChainWeightedByDuration(self):
+        self.durations['slow'] = 100
+        tested = downstreamimpact.DownstreamImpact({
+            ('slow', 'hash'): requirements('lib1'),
+            ('fast1', 'hash'): requirements('lib2'),
+            ('fast2', 'hash'): requirements('fast1')}, self.duration)
+        self.assertEquals(tested.chain(('lib1', 'hash')), 100)
+        self.assertEquals(tested.chain(('lib2', 'hash')), 2)
+        self.assertLess(tested.rank(('lib1', 'hash')), tested.rank(('lib2', 'hash')))
+
+    def test_Cycle(self):
+        tested = downstreamimpact.DownstreamImpact({
+            ('a', 'hash'): requirements('b'),
+            ('b', 'hash'): requirements('a')}, self.duration)
+        self.assertEquals(tested.blocked(('a', 'hash')), 1)
+        self.assertEquals(tested.chain(('a', 'hash')), 2)
+
+    def test_DeepChain(self):
+        DEPTH = 3000
+        tested = downstreamimpact.DownstreamImpact({
+            ('project%d' % i, 'hash'): requirements('project%d' % (i - 1)) for i in xrange(1, DEPTH)},
+            self.duration)
+        self.assertEquals(tested.chain(('project0', 'hash')), DEPTH - 1)
+        self.assertEquals(tested.blocked(('project0', 'hash')), DEPTH - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from dirbalak import filelock
+import tempfile
+import shutil
+import os
+import threading
+import time
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.lockFile = os.path.join(self.tempDir, "test.lock")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_SharedHoldersDoNotBlockEachOther(self):
+        tested = filelock.FileLock(self.lockFile)
+        with tested.lock(shared=True):
+            with tested.lock(timeout=1, shared=True):
+                statistics = filelock.statistics()[self.lockFile]
+                self.assertEquals(statistics['holders'], [threading.current_thread().name])
+        statistics = filelock.statistics()[self.lockFile]
+        self.assertEquals(statistics['acquisitions'], 2)
+        self.assertEquals(statistics['sharedAcquisitions'], 2)
+        self.assertEquals(statistics['holders'], [])
+
+    def test_ExclusiveAcquisitionTimesOutAndIsCounted(self):
+        tested = filelock.FileLock(self.lockFile)
+        other = filelock.FileLock(self.lockFile)
+        with tested.lock(timeout=1):
+            with self.assertRaises(Exception):
+                with other.lock(timeout=0.05):
+                    pass
+        with other.lock(timeout=1):
+            pass
+        statistics = filelock.statistics()[self.lockFile]
+        self.assertEquals(statistics['timeouts'], 1)
+        self.assertEquals(statistics['acquisitions'], 2)
+
+    def test_BlockedAcquirerWakesUpOnRelease(self):
+        for timeout in [5, None]:
+            holder = filelock.FileLock(self.lockFile)
+            waiter = filelock.FileLock(self.lockFile)
+            acquired = []
+            with holder.lock(timeout=1):
+                thread = threading.Thread(target=lambda: acquired.append(self.acquireAt(waiter, timeout)))
+                thread.start()
+                time.sleep(0.5)
+                self.assertEquals(acquired, [])
+                released = time.time()
+            thread.join()
+            self.assertLess(acquired[0] - released, 0.02)
+
+    def test_AbandonedFileLockAttemptIsReleased(self):
+        tested = filelock.FileLock(self.lockFile)
+        other = filelock.FileLock(self.lockFile)
+        with other.lock(timeout=1):
+            self.assertFalse(self.acquireExclusive(tested, 0.05))
+        self.assertTrue(self.acquireExclusive(tested, 1))
+        self.assertTrue(self.acquireExclusive(other, 1))
+
+    def test_WriterTimingOutWakesWaitingReaders(self):
+        tested = filelock.FileLock(self.lockFile)
+        held = threading.Event()
+        release = threading.Event()
+        threading.Thread(target=self.holdShared, args=(tested, held, release)).start()
+        held.wait()
+        try:
+            writer = threading.Thread(target=self.acquireExclusive, args=(tested, 0.2))
+            writer.start()
+            self.waitForWaitingWriter(tested)
+            before = time.time()
+            with tested.lock(timeout=5, shared=True):
+                pass
+            self.assertLess(time.time() - before, 2)
+            writer.join()
+        finally:
+            release.set()
+
+    def test_NestedSharedHoldDoesNotWaitForQueuedWriter(self):
+        tested = filelock.FileLock(self.lockFile)
+        writerAcquired = []
+        with tested.lock(shared=True):
+            writer = threading.Thread(target=lambda: writerAcquired.append(self.acquireExclusive(tested, 5)))
+            writer.start()
+            self.waitForWaitingWriter(tested)
+            with tested.lock(timeout=1, shared=True):
+                self.assertEquals(writerAcquired, [])
+        writer.join()
+        self.assertEquals(writerAcquired, [True])
+
+    def test_NestedExclusiveHold(self):
+        tested = filelock.FileLock(self.lockFile)
+        with tested.lock(timeout=1):
+            with tested.lock(timeout=1):
+                pass
+            with tested.lock(timeout=1, shared=True):
+                pass
+            self.assertFalse(self.acquireExclusive(filelock.FileLock(self.lockFile), 0.05))
+        with self.assertRaises(Exception):
+            with tested.lock(shared=True):
+                with tested.lock(timeout=1):
+                    pass
+
+    def holdShared(self, tested, held, release):
+        with tested.lock(timeout=1, shared=True):
+            held.set()
+            release.wait()
+
+    def acquireExclusive(self, tested, timeout):
+        try:
+            with tested.lock(timeout=timeout):
+                return True
+        except:
+            return False
+
+    def acquireAt(self, tested, timeout):
+        with tested.lock(timeout=timeout):
+            return time.time()
+
+    def waitForWaitingWriter(self, tested):
+        while tested._writersWaiting == 0:
+            time.sleep(0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
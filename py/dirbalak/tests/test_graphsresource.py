@@ -0,0 +1,89 @@
+import unittest
+from dirbalak import traverse
+from dirbalak import traversediff
+from dirbalak import repomirrorcache
+from dirbalak.server import graphsresource
+from dirbalak.server import tojs
+
+
+class FakeProject:
+    def __init__(self, gitURL, group):
+        self._gitURL = gitURL
+        self.groupName = group
+
+    def gitURL(self):
+        return self._gitURL
+
+    def group(self):
+        return self.groupName
+
+    def buildBanned(self):
+        return None
+
+    def masterBuildHistory(self):
+        return []
+
+
+class FakeMirror:
+    def __init__(self):
+        self.distance = dict(broken=False, commits=1)
+
+    def distancesFromMaster(self, hashes):
+        return {hash: self.distance for hash in hashes}
+
+
+class FakeMultiverse:
+    def __init__(self, traverseInstance):
+        self.projects = dict(project=FakeProject('https://github.com/org/project', 'group'))
+        self.traverseInstance = traverseInstance
+
+    def getTraverse(self):
+        return self.traverseInstance
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.increment = tojs.increment
+        self.generations = []
+        tojs.increment = self.generations.append
+        self.get = repomirrorcache.get
+        self.mirror = FakeMirror()
+        repomirrorcache.get = lambda gitURL: self.mirror
+        dependencies = traverse.Traverse.fromDependencies([
+            traverse.Dependency('project', 'origin/master', None, None, 'root', 'hash', False),
+            traverse.Dependency(
+                'lib', 'lib hash', 'project', 'origin/master', 'upseto', 'lib master', False)])
+        self.multiverse = FakeMultiverse(dependencies)
+        self.emptyDiff = traversediff.TraverseDiff(dependencies, dependencies)
+        self.tested = graphsresource.GraphsResource(self.multiverse)
+        self.tested.update()
+
+    def tearDown(self):
+        tojs.increment = self.increment
+        repomirrorcache.get = self.get
+
+    def test_EmptyDiffKeepsGraphs(self):
+        self.tested.update(self.emptyDiff)
+        self.assertEquals(len(self.generations), 1)
+
+    def test_GroupChangeWithEmptyDiffRegeneratesGraphs(self):
+        self.tested._allProjects._cache['key'] = ("svg", "map")
+        self.multiverse.projects['project'].groupName = 'other group'
+        self.tested.update(self.emptyDiff)
+        self.assertEquals(len(self.generations), 2)
+        self.assertEquals(self.tested._allProjects._cache, dict())
+
+    def test_NewProjectWithEmptyDiffRegeneratesGraphs(self):
+        self.multiverse.projects['library'] = FakeProject('https://github.com/org/library', 'group')
+        self.tested.update(self.emptyDiff)
+        self.assertEquals(len(self.generations), 2)
+
+
+    def test_DistanceChangeWithEmptyDiffRegeneratesGraphs(self):
+        self.mirror.distance = dict(broken=False, commits=2)
+        self.tested.update(self.emptyDiff)
+        self.assertEquals(len(self.generations), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+import unittest
+from dirbalak import traverse
+from dirbalak import traversediff
+from dirbalak.rackrun import jobqueue
+from dirbalak.rackrun import solventofficiallabels
+from dirbalak.server import tojs
+import threading
+import time
+
+
+class FakeProject:
+    def buildBanned(self):
+        return None
+
+    def buildRootFS(self):
+        return None
+
+
+class FakeMultiverse:
+    def __init__(self, dependencies):
+        self.projects = {dep.gitURL: FakeProject() for dep in dependencies}
+        self._traverse = traverse.Traverse.fromDependencies(dependencies)
+
+    def getTraverse(self):
+        return self._traverse
+
+
+class FakeSolventOfficialLabels:
+    generationOfAll = 0
+
+    def __init__(self, officialObjectStore):
+        self._labels = set()
+
+    def generation(self):
+        return self.generationOfAll
+
+    def built(self, basename, hash):
+        return (basename, hash) in self._labels
+
+    def builtMany(self, pairs):
+        return set(pairs) & self._labels
+
+    def markBuilt(self, basename, hash):
+        self._labels.add((basename, hash))
+
+
+class FakeTimer:
+    created = []
+
+    def __init__(self, interval, function):
+        self.function = function
+        self.created.append(self)
+
+    def start(self):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.originals = (
+            solventofficiallabels.SolventOfficialLabels, tojs.set, threading.Timer)
+        solventofficiallabels.SolventOfficialLabels = FakeSolventOfficialLabels
+        tojs.set = lambda key, value: None
+        threading.Timer = FakeTimer
+        FakeTimer.created = []
+        self.multiverse = FakeMultiverse([
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib master', False),
+            traverse.Dependency('lib', 'origin/master', None, None, 'master', 'lib master', False)])
+        self.tested = jobqueue.JobQueue(None, self.multiverse)
+
+    def tearDown(self):
+        solventofficiallabels.SolventOfficialLabels, tojs.set, threading.Timer = self.originals
+
+    def queued(self):
+        return set(
+            (priority, job['basename'], job['hash'])
+            for priority, jobs in self.tested.queue().iteritems() for job in jobs)
+
+    def test_RequirementNotBuilt(self):
+        self.tested.recalculate()
+        self.assertEquals(self.queued(), set([
+            (jobqueue.JobQueue.NON_MASTER_DEPENDENCIES, 'lib', 'lib old'),
+            (jobqueue.JobQueue.MASTERS_NOT_BUILT, 'lib', 'origin/master')]))
+        self.assertEquals(self.tested.cantBeBuilt(), {
+            ('app', 'origin/master'): [dict(basename='lib', hash='lib old')]})
+
+    def test_DoneUnblocksDependentJobs(self):
+        self.tested.recalculate()
+        job = self.tested.queue()[jobqueue.JobQueue.NON_MASTER_DEPENDENCIES][0]
+        self.tested.done(job, True)
+        self.assertEquals(self.queued(), set([
+            (jobqueue.JobQueue.MASTERS_NOT_BUILT, 'app', 'origin/master'),
+            (jobqueue.JobQueue.MASTERS_NOT_BUILT, 'lib', 'origin/master')]))
+        self.assertEquals(self.tested.cantBeBuilt(), dict())
+
+    def test_FailedJobIsRequeued(self):
+        self.tested.recalculate()
+        job = self.tested.queue()[jobqueue.JobQueue.MASTERS_NOT_BUILT][0]
+        self.tested.done(job, False)
+        self.assertEquals(self.queued(), set([
+            (jobqueue.JobQueue.NON_MASTER_DEPENDENCIES, 'lib', 'lib old'),
+            (jobqueue.JobQueue.MASTERS_WHICH_BUILD_ONLY_FAILED, 'lib', 'origin/master')]))
+        self.assertEquals(len(self.tested.cantBeBuilt()), 1)
+
+    def test_JobsBlockingMoreJobsComeFirst(self):
+        self.multiverse = FakeMultiverse([
+            traverse.Dependency('other', 'origin/master', None, None, 'root', 'other master', False),
+            traverse.Dependency(
+                'tool', 'tool old', 'other', 'origin/master', 'upseto', 'tool master', False),
+            traverse.Dependency('lib', 'lib old', 'other', 'origin/master', 'upseto', 'lib master', False),
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib master', False)])
+        self.tested = jobqueue.JobQueue(None, self.multiverse)
+        self.tested.recalculate()
+        self.assertEquals([
+            (job['basename'], job['hash'])
+            for job in self.tested.queue()[jobqueue.JobQueue.NON_MASTER_DEPENDENCIES]],
+            [('lib', 'lib old'), ('tool', 'tool old')])
+        self.assertEquals(self.tested.next()['basename'], 'lib')
+        self.assertEquals(self.tested.next()['basename'], 'tool')
+        self.assertIsNone(self.tested.next())
+
+    def test_DoneReranksJobsItDoesNotAffect(self):
+        self.multiverse = FakeMultiverse([
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('tool', 'tool old', 'app', 'origin/master', 'upseto', 'tool master', False),
+            traverse.Dependency('other', 'origin/master', None, None, 'root', 'other master', False),
+            traverse.Dependency(
+                'lib', 'lib old', 'other', 'origin/master', 'upseto', 'lib master', False),
+            traverse.Dependency('third', 'origin/master', None, None, 'root', 'third master', False),
+            traverse.Dependency('app', 'app old', 'third', 'origin/master', 'upseto', 'app master', False)])
+        self.tested = jobqueue.JobQueue(None, self.multiverse)
+        self.tested.recalculate()
+        self.assertEquals(self.nonMasterBasenames(), ['tool', 'app', 'lib'])
+        jobs = {job['basename']: job for job in [self.tested.next() for i in xrange(3)]}
+        reranked = []
+        rerank = self.tested._scheduler.rerank
+        self.tested._scheduler.rerank = lambda rankOf, keys: reranked.extend(keys) or rerank(rankOf, keys)
+        self.tested.done(jobs['app'], True)
+        self.assertEquals(self.nonMasterBasenames(), ['lib', 'tool'])
+        self.assertIn(('tool', 'tool old'), reranked)
+        self.assertNotIn(('lib', 'lib old'), reranked)
+
+    def test_RecalculateWithDiffReplacesOnlyAffectedJobs(self):
+        dependencies = [
+            traverse.Dependency('other', 'origin/master', None, None, 'root', 'other master', False),
+            traverse.Dependency(
+                'tool', 'tool old', 'other', 'origin/master', 'upseto', 'tool master', False),
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib master', False)]
+        self.multiverse = FakeMultiverse(dependencies)
+        self.tested = jobqueue.JobQueue(None, self.multiverse)
+        self.tested.recalculate()
+        before = self.jobsByBasename()
+        previous = self.multiverse.getTraverse()
+        dependencies[1] = dependencies[1]._replace(hash='tool new')
+        self.multiverse._traverse = traverse.Traverse.fromDependencies(dependencies)
+        self.tested.recalculate(traversediff.TraverseDiff(previous, self.multiverse.getTraverse()))
+        after = self.jobsByBasename()
+        self.assertIs(after['lib'], before['lib'])
+        self.assertEquals(after['tool']['hash'], 'tool new')
+        self.assertEquals(self.tested.cantBeBuilt(), {
+            ('other', 'origin/master'): [dict(basename='tool', hash='tool new')],
+            ('app', 'origin/master'): [dict(basename='lib', hash='lib old')]})
+        incremental = self.queued()
+        self.tested.recalculate()
+        self.assertEquals(self.queued(), incremental)
+
+    def test_RecalculateAfterLabelsChangedIsFull(self):
+        self.tested.recalculate()
+        before = self.jobsByBasename()
+        FakeSolventOfficialLabels.generationOfAll += 1
+        self.tested.recalculate(traversediff.TraverseDiff(
+            self.multiverse.getTraverse(), self.multiverse.getTraverse()))
+        self.assertIsNot(self.jobsByBasename()['lib'], before['lib'])
+
+    def test_PublishTimerStartedOnceUntilPublished(self):
+        self.tested.recalculate()
+        self.assertEquals(FakeTimer.created, [])
+        first = self.tested.next()
+        self.tested.next()
+        self.assertEquals(len(FakeTimer.created), 1)
+        FakeTimer.created[0].function()
+        self.tested.done(first, True)
+        self.assertEquals(len(FakeTimer.created), 2)
+
+    def test_PublishSnapshotsUnderLockAndPublishesOutsideIt(self):
+        self.tested.recalculate()
+        published = dict()
+
+        def publish(key, value):
+            published[key] = (value, self.tested._lock.locked())
+        tojs.set = publish
+        with self.tested._lock:
+            publisher = threading.Thread(target=self.tested._publish)
+            publisher.start()
+            time.sleep(0.1)
+            self.assertEquals(published, dict())
+        publisher.join()
+        self.assertFalse(published['queue/queue'][1])
+        self.assertFalse(published['queue/cantBeBuilt'][1])
+        self.tested.next()
+        self.assertFalse(any(
+            job['inProgress'] for jobs in published['queue/queue'][0].values() for job in jobs))
+
+    def jobsByBasename(self):
+        return {
+            job['basename']: job
+            for jobs in self.tested.queue().values() for job in jobs if job['hash'] != 'origin/master'}
+
+    def nonMasterBasenames(self):
+        return [job['basename'] for job in self.tested.queue()[jobqueue.JobQueue.NON_MASTER_DEPENDENCIES]]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from dirbalak.rackrun import jobscheduler
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.tested = jobscheduler.JobScheduler([1, 2])
+
+    def put(self, name, priority, inProgress=False):
+        job = dict(name=name, inProgress=inProgress)
+        self.tested.put(name, priority, job)
+        return job
+
+    def take(self):
+        job = self.tested.next()
+        if job is None:
+            return None
+        job['inProgress'] = True
+        return job['name']
+
+    def test_RoundRobinWithinPriority(self):
+        for name in ['a', 'b', 'c']:
+            self.put(name, 1)
+        self.assertEquals([self.take() for i in xrange(4)], ['a', 'b', 'c', None])
+        for name in ['a', 'b', 'c']:
+            self.tested.remove(name)
+        self.put('c', 1)
+        self.put('a', 1)
+        self.put('b', 1)
+        self.assertEquals([self.take() for i in xrange(3)], ['a', 'b', 'c'])
+
+    def test_RotatesBetweenPriorities(self):
+        for name in ['a', 'b']:
+            self.put(name, 1)
+        for name in ['c', 'd']:
+            self.put(name, 2)
+        self.assertEquals([self.take() for i in xrange(5)], ['c', 'a', 'd', 'b', None])
+
+    def test_JobsInProgressAreSkipped(self):
+        self.put('a', 1, inProgress=True)
+        self.put('b', 1)
+        self.assertEquals(self.take(), 'b')
+        self.assertEquals(self.take(), None)
+        self.assertEquals(self.tested.queue(), {1: [
+            dict(name='a', inProgress=True), dict(name='b', inProgress=True)]})
+
+    def test_BetterPriorityReplacesJob(self):
+        self.put('a', 2)
+        self.put('a', 1)
+        self.assertEquals(self.tested.priority('a'), 1)
+        self.assertEquals(self.take(), 'a')
+        self.assertEquals(self.take(), None)
+
+    def test_ServedJobsKeepTheirTurnAcrossClear(self):
+        for name in ['a', 'b']:
+            self.put(name, 1)
+        self.assertEquals(self.take(), 'a')
+        self.tested.clear()
+        for name in ['a', 'b']:
+            self.put(name, 1)
+        self.assertEquals([self.take() for i in xrange(2)], ['b', 'a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
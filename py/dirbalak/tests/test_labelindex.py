@@ -0,0 +1,124 @@
+import unittest
+import tempfile
+import shutil
+import os
+from dirbalak import labelindex
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.labelsFile = os.path.join(self.directory, "labels")
+        self.invocationsFile = os.path.join(self.directory, "invocations")
+        osmosis = os.path.join(self.directory, "osmosis")
+        with open(osmosis, "w") as f:
+            f.write("#!/bin/sh\necho >> %s\ncat %s\n" % (self.invocationsFile, self.labelsFile))
+        os.chmod(osmosis, 0755)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.directory + ":" + self.path
+        self.setLabels([
+            "solvent__project__build__1111__official",
+            "solvent__project__build__2222__clean",
+            "solvent__other__build__3333__official"])
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def setLabels(self, labels):
+        with open(self.labelsFile, "w") as f:
+            f.write("\n".join(labels) + "\n")
+
+    def invocations(self):
+        if not os.path.exists(self.invocationsFile):
+            return 0
+        with open(self.invocationsFile) as f:
+            return len(f.readlines())
+
+    def test_ListsLabelsOnceForManyQueries(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        self.assertEquals(self.invocations(), 0)
+        self.assertTrue(tested.built("project", "1111"))
+        self.assertFalse(tested.built("project", "2222"))
+        self.assertTrue(tested.built("other", "3333"))
+        self.assertFalse(tested.built("missing", "4444"))
+        self.assertEquals(tested.states("project", "2222"), set(["clean"]))
+        self.assertEquals(tested.states("missing", "4444"), set())
+        self.assertEquals(self.invocations(), 1)
+
+    def test_ManyQueriesInOneCall(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        pairs = [("project", "1111"), ("project", "2222"), ("other", "3333"), ("missing", "4444")]
+        self.assertEquals(tested.statesMany(pairs), {
+            ("project", "1111"): set(["official"]), ("project", "2222"): set(["clean"]),
+            ("other", "3333"): set(["official"]), ("missing", "4444"): set()})
+        self.assertEquals(tested.builtMany(pairs), set([("project", "1111"), ("other", "3333")]))
+        self.assertEquals(self.invocations(), 1)
+
+    def test_ManyQueriesTakeTheLockOnce(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        acquisitions = []
+
+        class CountingLock:
+            def __enter__(self):
+                acquisitions.append(True)
+
+            def __exit__(self, *args):
+                pass
+        tested._lock = CountingLock()
+        tested.builtMany([("project", str(i)) for i in xrange(100)])
+        self.assertEquals(len(acquisitions), 1)
+
+    def test_AddedLabelVisibleWithoutRelisting(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        self.assertFalse(tested.built("project", "2222"))
+        tested.add("project", "2222", "official")
+        self.assertTrue(tested.built("project", "2222"))
+        self.assertEquals(self.invocations(), 1)
+
+    def test_AddDoesNotList(self):
+        os.unlink(self.labelsFile)
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=0)
+        tested.add("project", "2222", "official")
+        self.assertEquals(self.invocations(), 0)
+
+    def test_RefreshAfterTimeToLive(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=0)
+        self.assertFalse(tested.built("project", "5555"))
+        self.setLabels(["solvent__project__build__5555__official"])
+        self.assertTrue(tested.built("project", "5555"))
+        self.assertFalse(tested.built("project", "1111"))
+        self.assertEquals(self.invocations(), 3)
+
+    def test_LookupWithoutRefreshDoesNotList(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=0)
+        self.assertFalse(tested.built("project", "5555", refresh=False))
+        self.assertEquals(self.invocations(), 0)
+        tested.refreshIfStale()
+        self.setLabels(["solvent__project__build__5555__official"])
+        self.assertFalse(tested.built("project", "5555", refresh=False))
+        self.assertTrue(tested.built("project", "1111", refresh=False))
+        self.assertEquals(self.invocations(), 1)
+
+    def test_Invalidate(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        self.assertFalse(tested.built("project", "5555"))
+        self.setLabels(["solvent__project__build__5555__official"])
+        self.assertFalse(tested.built("project", "5555"))
+        tested.invalidate()
+        self.assertTrue(tested.built("project", "5555"))
+
+    def test_KeepsPreviousIndexIfListingFails(self):
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=0)
+        self.assertTrue(tested.built("project", "1111"))
+        os.unlink(self.labelsFile)
+        self.assertTrue(tested.built("project", "1111"))
+
+    def test_EmptyObjectStore(self):
+        self.setLabels([])
+        tested = labelindex.LabelIndex("objectstore:1010", timeToLive=1000)
+        self.assertFalse(tested.built("project", "1111"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from dirbalak import lrucache
+import time
+
+
+class Test(unittest.TestCase):
+    def test_EvictsLeastRecentlyUsed(self):
+        tested = lrucache.LRUCache(maximumValues=2)
+        tested.set('a', 1)
+        tested.set('b', 2)
+        self.assertEquals(tested.get('a'), 1)
+        tested.set('c', 3)
+        self.assertEquals(tested.get('b'), None)
+        self.assertEquals(tested.get('a'), 1)
+        self.assertEquals(tested.get('c'), 3)
+        statistics = tested.statistics()
+        self.assertEquals(statistics['evictions'], 1)
+        self.assertEquals(statistics['hits'], 3)
+        self.assertEquals(statistics['misses'], 1)
+        self.assertEquals(statistics['values'], 2)
+
+    def test_ManyMoreValuesThanMaximum(self):
+        tested = lrucache.LRUCache(maximumValues=100)
+        for i in xrange(1000):
+            tested.set(i, i)
+        self.assertEquals(tested.statistics()['values'], 100)
+        self.assertEquals(tested.get(899), None)
+        self.assertEquals(tested.get(900), 900)
+
+    def test_MaximumBytes(self):
+        tested = lrucache.LRUCache(maximumValues=100, maximumBytes=10, sizeOf=len)
+        tested.set('a', "12345")
+        tested.set('b', "12345")
+        self.assertEquals(tested.statistics()['bytes'], 10)
+        tested.set('a', "123")
+        self.assertEquals(tested.statistics()['bytes'], 8)
+        tested.set('c', "123")
+        self.assertEquals(tested.get('b'), None)
+        self.assertEquals(tested.statistics()['bytes'], 6)
+
+    def test_TimeToLive(self):
+        tested = lrucache.LRUCache(timeToLive=0.05, negativeTimeToLive=10)
+        tested.set('positive', True)
+        tested.set('negative', False, negative=True)
+        time.sleep(0.1)
+        self.assertEquals(tested.get('positive'), None)
+        self.assertEquals(tested.get('negative'), False)
+        statistics = tested.statistics()
+        self.assertEquals(statistics['expirations'], 1)
+        self.assertEquals(statistics['negativeHits'], 1)
+
+    def test_Getter(self):
+        calls = []
+
+        def getter(key):
+            calls.append(key)
+            return key in ['exists']
+        tested = lrucache.LRUCache()
+        get = tested.getter(
+            getter, limitKeys=lambda key: key != 'uncached', isNegative=lambda value: not value)
+        for i in xrange(2):
+            self.assertTrue(get('exists'))
+            self.assertFalse(get('missing'))
+            self.assertFalse(get('uncached'))
+        self.assertEquals(calls, ['exists', 'missing', 'uncached', 'uncached'])
+        tested.discardNegative()
+        self.assertFalse(get('missing'))
+        self.assertTrue(get('exists'))
+        self.assertEquals(calls, ['exists', 'missing', 'uncached', 'uncached', 'missing'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from dirbalak import traverse
+from dirbalak import repomirrorcache
+from dirbalak.server import multiverse
+from dirbalak.server import traversesnapshot
+
+
+class FakeMirror:
+    def __init__(self):
+        self.remembered = []
+
+    def rememberDistancesFromMaster(self, masterHash, distances):
+        self.remembered.append((masterHash, distances))
+
+
+class FakeProject:
+    def __init__(self, gitURL):
+        self._gitURL = gitURL
+        self.traverse = None
+
+    def gitURL(self):
+        return self._gitURL
+
+    def basename(self):
+        return self._gitURL
+
+    def setTraverse(self, traverseInstance):
+        self.traverse = traverseInstance
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.originalCache = repomirrorcache._cache
+        self.originalGet = repomirrorcache.get
+        self.mirrors = dict(app=FakeMirror(), lib=FakeMirror(), tool=FakeMirror())
+        repomirrorcache._cache = dict(self.mirrors)
+        self.gotten = []
+        repomirrorcache.get = lambda gitURL: self.gotten.append(gitURL) or repomirrorcache._cache[gitURL]
+
+    def tearDown(self):
+        repomirrorcache._cache = self.originalCache
+        repomirrorcache.get = self.originalGet
+
+    def test_RestoreSkipsMirrorsThatAreNotAttached(self):
+        traverseInstance = traverse.Traverse.fromDependencies([
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib master', False),
+            traverse.Dependency('tool', 'origin/master', None, None, 'root', 'tool master', False),
+            traverse.Dependency(
+                'remote', 'remote old', 'tool', 'origin/master', 'upseto', 'r master', False)])
+        libDistances = {'lib old': dict(broken=False, commits=1, timestamp=1000)}
+        remoteDistances = {'remote old': dict(broken=True)}
+        snapshot = traversesnapshot.Snapshot(traverseInstance, dict(
+            lib=dict(masterHash='lib master', distances=libDistances),
+            remote=dict(masterHash='r master', distances=remoteDistances)))
+        tested = multiverse.Multiverse(fetchThread=None)
+        tested.projects = dict(app=FakeProject('app'), tool=FakeProject('tool'))
+        tested.restore(snapshot)
+        self.assertIs(tested.getTraverse(), traverseInstance)
+        self.assertEquals(self.mirrors['lib'].remembered, [('lib master', libDistances)])
+        self.assertIs(tested.projects['app'].traverse, traverseInstance)
+        self.assertIsNone(tested.projects['tool'].traverse)
+        self.assertNotIn('remote', self.gotten)
+
+
+if __name__ == '__main__':
+    unittest.main()
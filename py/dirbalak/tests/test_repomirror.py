@@ -0,0 +1,266 @@
+import unittest
+import tempfile
+import shutil
+import subprocess
+import os
+import time
+from dirbalak import config
+from dirbalak import manifeststore
+from dirbalak import repomirror
+
+
+class Test(unittest.TestCase):
+    _CONFIG = [
+        "REPO_MIRRORS_BASEDIR", "READ_MANIFESTS_FROM_GIT_OBJECTS", "MANIFEST_STORE_FILENAME",
+        "BARE_REPO_MIRRORS", "PARTIAL_CLONE_REPO_MIRRORS"]
+    _REQUIREMENTS = "{\"requirements\": [{\"originURL\": \"file:///other\", \"hash\": \"%s\"}]}\n" % (
+        "1" * 40)
+    _REQUIREMENT = dict(originURL="file:///other", hash="1" * 40)
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.origin = os.path.join(self.temp, "origin", "project")
+        os.makedirs(self.origin)
+        self.git(["init", "--quiet"])
+        self.git(["symbolic-ref", "HEAD", "refs/heads/master"])
+        self.firstHash = self.commit("upseto.manifest", "{\"requirements\": []}\n")
+        self.originalConfig = {name: getattr(config, name) for name in self._CONFIG}
+        config.REPO_MIRRORS_BASEDIR = os.path.join(self.temp, "repomirrors")
+        config.MANIFEST_STORE_FILENAME = os.path.join(self.temp, "manifests.sqlite")
+        manifeststore._instance = None
+
+    def tearDown(self):
+        for name, value in self.originalConfig.iteritems():
+            setattr(config, name, value)
+        manifeststore._instance = None
+        shutil.rmtree(self.temp, ignore_errors=True)
+
+    def git(self, args):
+        return subprocess.check_output(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@test"] + args, cwd=self.origin)
+
+    def commit(self, filename, contents):
+        with open(os.path.join(self.origin, filename), "w") as f:
+            f.write(contents)
+        self.git(["add", filename])
+        self.git(["commit", "--quiet", "-m", "Changed %s" % filename])
+        return self.git(["rev-parse", "HEAD"]).strip()
+
+    def mirrorDirectory(self):
+        identifier = ("file://" + self.origin).replace(":", "_").replace("/", "_")
+        return os.path.join(config.REPO_MIRRORS_BASEDIR, identifier, "project")
+
+    def mirrorGit(self, args):
+        return subprocess.check_output(["git"] + args, cwd=self.mirrorDirectory())
+
+    def test_FetchIsSkippedWhenRemoteRefsAreUnchanged(self):
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        self.assertTrue(tested.fetch())
+        self.assertEquals(tested.hash('origin/master'), self.firstHash)
+        self.assertFalse(tested.fetch())
+        secondHash = self.commit("dirbalak.manifest", "{}\n")
+        self.assertFalse(tested.hashExists(secondHash))
+        self.assertTrue(tested.fetch())
+        self.assertEquals(tested.hash('origin/master'), secondHash)
+        self.assertTrue(tested.hashExists(secondHash))
+        self.assertFalse(tested.fetch())
+
+    def test_FetchPrunesDeletedRemoteBranches(self):
+        self.git(["branch", "feature"])
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        self.assertTrue(tested.fetch())
+        self.assertEquals(tested.hash('origin/feature'), self.firstHash)
+        self.assertFalse(tested.fetch())
+        self.git(["branch", "--quiet", "-D", "feature"])
+        self.assertTrue(tested.fetch())
+        self.assertRaises(Exception, tested.hash, 'origin/feature')
+        self.assertFalse(tested.fetch())
+
+    def test_ReadsManifestsWithoutCheckout(self):
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(tested.upsetoManifest(self.firstHash).requirements(), [])
+        with self.assertRaises(KeyError):
+            tested.dirbalakManifest(self.firstHash).buildRootFSLabel()
+        self.assertEquals(tested.distanceFromMaster(self.firstHash), None)
+        self.assertTrue(manifeststore.instance().known("file://" + self.origin, self.firstHash))
+
+    def test_ReadsManifestsOfOlderCommitsWithoutTouchingTheWorkingTree(self):
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(tested.upsetoManifest(self.firstHash).requirements(), [])
+        self.assertEquals(tested.upsetoManifest(secondHash).requirements(), [self._REQUIREMENT])
+        self.assertEquals(tested.solventManifest(secondHash).requirements(), [])
+        self.assertEquals(self.mirrorGit(["rev-parse", "HEAD"]).strip(), secondHash)
+
+    def test_ReadsManifestsByCheckingOut(self):
+        config.READ_MANIFESTS_FROM_GIT_OBJECTS = False
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(tested.upsetoManifest(self.firstHash).requirements(), [])
+        self.assertEquals(self.mirrorGit(["rev-parse", "HEAD"]).strip(), self.firstHash)
+        self.assertEquals(tested.upsetoManifest(secondHash).requirements(), [self._REQUIREMENT])
+
+    def test_ResolvesHashesAndCommitsAfterFetch(self):
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(tested.hash('origin/master'), self.firstHash)
+        self.assertTrue(tested.hashExists(self.firstHash))
+        self.assertFalse(tested.hashExists("0" * 40))
+        self.assertEquals(
+            tested.commitTimestamp(self.firstHash), int(self.git(["log", "-1", "--format=%at"]).strip()))
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested.fetch()
+        self.assertEquals(tested.hash('origin/master'), secondHash)
+        self.assertEquals(tested.branchName(secondHash), 'origin/master')
+        self.assertEquals(tested.upsetoManifest(secondHash).requirements()[0]['hash'], "1" * 40)
+
+    def test_BareMirror(self):
+        config.BARE_REPO_MIRRORS = True
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(self.mirrorGit(["rev-parse", "--is-bare-repository"]).strip(), "true")
+        self.assertEquals(tested.hash('origin/master'), self.firstHash)
+        self.assertEquals(tested.upsetoManifest(self.firstHash).requirements(), [])
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested.fetch()
+        self.assertEquals(tested.hash('origin/master'), secondHash)
+        self.assertEquals(tested.run(["cat", "upseto.manifest"], self.firstHash), "{\"requirements\": []}\n")
+        self.assertEquals(tested.run(["cat", "upseto.manifest"], secondHash), self._REQUIREMENTS)
+
+    def test_BareMirrorRunRemovesItsWorktree(self):
+        config.BARE_REPO_MIRRORS = True
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        worktree = tested.run(["pwd"], self.firstHash).strip()
+        self.assertFalse(os.path.exists(worktree))
+        self.assertEquals(self.mirrorGit(["worktree", "list", "--porcelain"]).count("worktree "), 1)
+
+    def test_StageFromMirror(self):
+        self.checkStage()
+
+    def test_StageFromBareMirror(self):
+        config.BARE_REPO_MIRRORS = True
+        self.checkStage()
+
+    def test_StageFromPartialMirror(self):
+        self.git(["config", "uploadpack.allowFilter", "true"])
+        config.PARTIAL_CLONE_REPO_MIRRORS = True
+        self.checkStage()
+
+    def test_StageFromBarePartialMirror(self):
+        self.git(["config", "uploadpack.allowFilter", "true"])
+        config.PARTIAL_CLONE_REPO_MIRRORS = True
+        config.BARE_REPO_MIRRORS = True
+        self.checkStage()
+
+    def checkStage(self):
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        destination = os.path.join(self.temp, "build")
+        os.makedirs(destination)
+        directory = tested.stage(destination, self.firstHash)
+        self.assertEquals(directory, os.path.join(destination, "project"))
+        with open(os.path.join(directory, "upseto.manifest")) as f:
+            self.assertEquals(f.read(), "{\"requirements\": []}\n")
+
+        def stagedGit(args):
+            return subprocess.check_output(["git"] + args, cwd=directory).strip()
+        self.assertEquals(stagedGit(["rev-parse", "HEAD"]), self.firstHash)
+        self.assertEquals(stagedGit(["rev-parse", "origin/master"]), secondHash)
+        self.assertEquals(stagedGit(["config", "remote.origin.url"]), "file://" + self.origin)
+        self.assertEquals(stagedGit(["status", "--porcelain"]), "")
+
+    def test_HydrateFetchesMissingBlobsIntoPartialMirror(self):
+        self.git(["config", "uploadpack.allowFilter", "true"])
+        config.PARTIAL_CLONE_REPO_MIRRORS = True
+        config.BARE_REPO_MIRRORS = True
+        self.commit("other", "contents\n")
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(len(self.missingInMirror("origin/master")), 2)
+        tested._hydrate(self.firstHash)
+        self.assertEquals(len(self.missingInMirror(self.firstHash)), 0)
+        self.assertEquals(len(self.missingInMirror("origin/master")), 1)
+        tested._hydrate(self.firstHash)
+
+    def missingInMirror(self, hash):
+        objects = self.mirrorGit(["rev-list", "--objects", "--missing=print", hash + "^{tree}"])
+        return [line for line in objects.split("\n") if line.startswith("?")]
+
+    def test_PartialMirror(self):
+        self.checkPartialMirror(bare=False)
+
+    def test_BarePartialMirror(self):
+        self.checkPartialMirror(bare=True)
+
+    def checkPartialMirror(self, bare):
+        self.git(["config", "uploadpack.allowFilter", "true"])
+        config.PARTIAL_CLONE_REPO_MIRRORS = True
+        config.BARE_REPO_MIRRORS = bare
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(self.mirrorGit(["config", "remote.origin.promisor"]).strip(), "true")
+        self.assertEquals(
+            self.mirrorGit(["config", "remote.origin.partialclonefilter"]).strip(), "blob:none")
+        self.assertEquals(tested.upsetoManifest(self.firstHash).requirements(), [])
+        self.assertEquals(tested.hash('origin/master'), secondHash)
+        self.assertEquals(tested.run(["cat", "upseto.manifest"], self.firstHash), "{\"requirements\": []}\n")
+
+    def test_DistancesFromMasterMatchRevList(self):
+        secondHash = self.commit("upseto.manifest", self._REQUIREMENTS)
+        self.git(["checkout", "--quiet", "-b", "feature", self.firstHash])
+        featureHashes = [self.commit("feature%d" % i, "feature\n") for i in xrange(2)]
+        self.git(["checkout", "--quiet", "-b", "diverged", secondHash])
+        divergedHashes = [self.commit("diverged%d" % i, "diverged\n") for i in xrange(3)]
+        self.git(["checkout", "--quiet", "master"])
+        thirdHash = self.commit("solvent.manifest", "{\"requirements\": []}\n")
+        self.git(["merge", "--quiet", "--no-ff", "-m", "Merge feature", "feature"])
+        mergeHash = self.git(["rev-parse", "HEAD"]).strip()
+        self.commit("dirbalak.manifest", "{}\n")
+        hashes = [self.firstHash, secondHash, thirdHash, mergeHash] + featureHashes + divergedHashes
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        distances = tested.distancesFromMaster(hashes + ["0" * 40])
+        self.assertEquals(distances["0" * 40], dict(broken=True))
+        for hash in hashes:
+            expected = self.distanceFromRevList(hash)
+            self.assertEquals(distances[hash].get('commits'), expected['commits'])
+            self.assertEquals(distances[hash]['broken'], expected['broken'])
+            self.assertAlmostEqual(distances[hash].get('time', 0), expected.get('time', 0), delta=5)
+            self.assertEquals(tested.distanceFromMaster(hash).get('commits'), expected['commits'])
+
+    def test_RemembersCachedDistances(self):
+        self.commit("solvent.manifest", "{\"requirements\": []}\n")
+        tested = repomirror.RepoMirror("file://" + self.origin)
+        tested.fetch()
+        self.assertEquals(tested.distancesFromMaster([self.firstHash])[self.firstHash]['commits'], 1)
+        cached = tested.cachedDistancesFromMaster([self.firstHash, 'origin/master'])
+        self.assertEquals(cached['masterHash'], tested.hash('origin/master'))
+        self.assertEquals(cached['distances'].keys(), [self.firstHash])
+        restored = repomirror.RepoMirror("file://" + self.origin)
+        restored.existing()
+        restored.rememberDistancesFromMaster(cached['masterHash'], dict(
+            (hash, dict(distance, commits=7)) for hash, distance in cached['distances'].iteritems()))
+        self.assertEquals(restored.distancesFromMaster([self.firstHash])[self.firstHash]['commits'], 7)
+
+    def distanceFromRevList(self, hash):
+        left, right = [int(count) for count in self.git(
+            ["rev-list", "--count", "--left-right", "%s...master" % hash]).split()]
+        result = dict(broken=False, commits=left + right)
+        if right > 0:
+            try:
+                ancestor = self.git(["rev-parse", "--quiet", "--verify", "master~%d" % (right - 1)]).strip()
+            except subprocess.CalledProcessError:
+                result['broken'] = True
+            else:
+                result['time'] = time.time() - int(self.git(["log", "-1", "--format=%at", ancestor]).strip())
+        return result
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -146,6 +146,105 @@ class Test(unittest.TestCase):
             'dependencilessProject', 'origin/master', None, None, 'master', 'master hash', False),
             dependencies)
 
+    def test_DeepChainOfRequirements(self):
+        DEPTH = 3000
+        for i in xrange(DEPTH):
+            requirements = [] if i == DEPTH - 1 else [dict(originURL='project%d' % (i + 1), hash='hash')]
+            self.mirrors['project%d' % i] = FakeMirror(
+                'master hash', {'origin/master': requirements, 'hash': requirements},
+                {'origin/master': [], 'hash': []})
+        tested = traverse.Traverse(visitMasterBranchOfEachDependency=False)
+        tested.traverse('project0', 'origin/master')
+        dependencies = tested.dependencies()
+        self.assertEquals(len(dependencies), DEPTH)
+        self.assertEquals([dep.gitURL for dep in dependencies], ['project%d' % i for i in xrange(DEPTH)])
+        self.assertEquals(dependencies[-1], traverse.Dependency(
+            'project%d' % (DEPTH - 1), 'hash', 'project%d' % (DEPTH - 2), 'hash', 'upseto', 'master hash',
+            False))
+
+    def test_RequirementSharedByTwoProjects(self):
+        for name in ['project1', 'project2']:
+            self.mirrors[name] = FakeMirror(
+                'master hash of ' + name,
+                {'origin/master': [dict(originURL='library', hash='library hash')]},
+                {'origin/master': []})
+        self.mirrors['library'] = FakeMirror(
+            'master hash', {'origin/master': [], 'library hash': [dict(originURL='leaf', hash='leaf hash')]},
+            {'origin/master': [], 'library hash': []})
+        self.mirrors['leaf'] = FakeMirror(
+            'leaf hash', {'origin/master': []}, {'origin/master': []})
+        tested = traverse.Traverse()
+        tested.traverse('project1', 'origin/master')
+        tested.traverse('project2', 'origin/master')
+        self.assertEquals(tested.dependencies(), [
+            traverse.Dependency(
+                'project1', 'origin/master', None, None, 'root', 'master hash of project1', False),
+            traverse.Dependency(
+                'library', 'library hash', 'project1', 'origin/master', 'upseto', 'master hash', False),
+            traverse.Dependency(
+                'leaf', 'origin/master', 'library', 'library hash', 'upseto', 'leaf hash', False),
+            traverse.Dependency('leaf', 'origin/master', None, None, 'master', 'leaf hash', False),
+            traverse.Dependency('library', 'origin/master', None, None, 'master', 'master hash', False),
+            traverse.Dependency(
+                'project2', 'origin/master', None, None, 'root', 'master hash of project2', False),
+            traverse.Dependency(
+                'library', 'library hash', 'project2', 'origin/master', 'upseto', 'master hash', False)])
+
+    def test_RetraverseExpandsOnlyChangedRepositories(self):
+        self.mirrors['upsetoDepedantProject'] = FakeMirror(
+            'master hash 2',
+            {'origin/master': [dict(originURL='dependencilessProject', hash='master hash')]},
+            {'origin/master': []})
+        self.mirrors['dependencilessProject'] = FakeMirror(
+            'master hash', {'origin/master': []}, {'origin/master': []})
+        previous = traverse.Traverse()
+        previous.traverse('upsetoDepedantProject', 'origin/master')
+        self.mirrors['upsetoDepedantProject'] = FakeMirror('master hash 2', {}, {})
+        self.mirrors['dependencilessProject'] = FakeMirror(
+            'master hash 3', {'origin/master': [], 'master hash': []},
+            {'origin/master': [], 'master hash': []})
+        tested = traverse.Traverse(previous=previous, changedGitURLs=set(['dependencilessProject']))
+        tested.traverse('dependencilessProject', 'origin/master')
+        tested.traverse('upsetoDepedantProject', 'origin/master')
+        self.assertEquals(tested.dependencies(), [
+            traverse.Dependency(
+                'dependencilessProject', 'origin/master', None, None, 'root', 'master hash 3', False),
+            traverse.Dependency(
+                'upsetoDepedantProject', 'origin/master', None, None, 'root', 'master hash 2', False),
+            traverse.Dependency(
+                'dependencilessProject', 'master hash', 'upsetoDepedantProject', 'origin/master', 'upseto',
+                'master hash 3', False)])
+
+    def test_Index(self):
+        self.mirrors['upsetoDepedantProject'] = FakeMirror(
+            'master hash 2',
+            {'origin/master': [dict(originURL='dependencilessProject', hash='non master hash')]},
+            {'origin/master': []})
+        self.mirrors['dependencilessProject'] = FakeMirror(
+            'master hash', {'origin/master': [], 'non master hash': []},
+            {'origin/master': [], 'non master hash': []})
+        tested = traverse.Traverse()
+        tested.traverse('upsetoDepedantProject', 'origin/master')
+        index = tested.index()
+        self.assertIs(tested.index(), index)
+        upsetoDependency = traverse.Dependency(
+            'dependencilessProject', 'non master hash', 'upsetoDepedantProject',
+            'origin/master', 'upseto', 'master hash', False)
+        masterDependency = traverse.Dependency(
+            'dependencilessProject', 'origin/master', None, None, 'master', 'master hash', False)
+        self.assertEquals(index.dependenciesOf('upsetoDepedantProject', 'origin/master'), [upsetoDependency])
+        self.assertEquals(index.dependenciesOf('dependencilessProject', 'origin/master'), [])
+        self.assertEquals(index.dependentsOf('dependencilessProject'), [upsetoDependency, masterDependency])
+        self.assertEquals(index.ofType('master'), [masterDependency])
+        self.assertEquals(len(index.dependencies()), 3)
+
+    def test_FromDependencies(self):
+        dependency = traverse.Dependency(
+            'dependencilessProject', 'origin/master', None, None, 'root', 'master hash', False)
+        tested = traverse.Traverse.fromDependencies([dependency])
+        self.assertEquals(tested.dependencies(), [dependency])
+        self.assertEquals(tested.index().ofType('root'), [dependency])
+
     def test_CoverErrorReportingFlow(self):
         self.mirrors['dependencilessProject'] = FakeMirror(
             'master hash', {}, {})
@@ -0,0 +1,52 @@
+import unittest
+from dirbalak import traverse
+from dirbalak import traversediff
+
+
+def dependency(gitURL, hash, requiringURL, requiringURLHash, masterHash, broken=False):
+    type = 'root' if requiringURL is None else 'upseto'
+    return traverse.Dependency(gitURL, hash, requiringURL, requiringURLHash, type, masterHash, broken)
+
+
+class Test(unittest.TestCase):
+    def test_NothingChanged(self):
+        dependencies = [
+            dependency('project', 'origin/master', None, None, 'hash1'),
+            dependency('library', 'hash2', 'project', 'origin/master', 'hash3')]
+        tested = traversediff.TraverseDiff(
+            traverse.Traverse.fromDependencies(dependencies),
+            traverse.Traverse.fromDependencies(dependencies))
+        self.assertTrue(tested.empty())
+
+    def test_FirstGeneration(self):
+        current = traverse.Traverse.fromDependencies([
+            dependency('project', 'origin/master', None, None, 'hash1'),
+            dependency('library', 'hash2', 'project', 'origin/master', 'hash3', broken=True)])
+        tested = traversediff.TraverseDiff(None, current)
+        self.assertEquals(tested.addedEdges(), [current.dependencies()[1]])
+        self.assertEquals(tested.removedEdges(), [])
+        self.assertEquals(tested.changedMasterHashes(), dict(
+            project=(None, 'hash1'), library=(None, 'hash3')))
+        self.assertEquals(tested.broke(), [('library', 'hash2')])
+        self.assertFalse(tested.empty())
+
+    def test_RequirementMovedAndRepaired(self):
+        previous = traverse.Traverse.fromDependencies([
+            dependency('project', 'origin/master', None, None, 'hash1'),
+            dependency('library', 'hash2', 'project', 'origin/master', 'hash3', broken=True)])
+        current = traverse.Traverse.fromDependencies([
+            dependency('project', 'origin/master', None, None, 'hash4'),
+            dependency('library', 'hash2', 'other', 'origin/master', 'hash3'),
+            dependency('library', 'hash3', 'project', 'origin/master', 'hash3')])
+        tested = traversediff.TraverseDiff(previous, current)
+        self.assertEquals(
+            sorted(tested.addedEdges()), sorted([current.dependencies()[1], current.dependencies()[2]]))
+        self.assertEquals(tested.removedEdges(), [previous.dependencies()[1]])
+        self.assertEquals(tested.changedMasterHashes(), dict(project=('hash1', 'hash4')))
+        self.assertEquals(tested.broke(), [])
+        self.assertEquals(tested.repaired(), [('library', 'hash2')])
+        self.assertEquals(len(tested.asDict()['addedEdges']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
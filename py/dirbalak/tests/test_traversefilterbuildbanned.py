@@ -0,0 +1,62 @@
+import unittest
+from upseto import gitwrapper
+from dirbalak import traverse
+from dirbalak import traversefilterreachable
+from dirbalak.rackrun import traversefilterbuildbanned
+
+
+class FakeProject:
+    def __init__(self, buildBanned):
+        self._buildBanned = buildBanned
+
+    def buildBanned(self):
+        return self._buildBanned
+
+
+class FakeMultiverse:
+    def __init__(self, banned, notBanned):
+        self.projects = dict(
+            [(basename, FakeProject("banned")) for basename in banned] +
+            [(basename, FakeProject(None)) for basename in notBanned])
+
+
+def unindexedBuildBanned(multiverse, dependencies):
+    def banned(gitURL):
+        if gitURL is None:
+            return False
+        project = multiverse.projects.get(gitwrapper.originURLBasename(gitURL), None)
+        return project is None or bool(project.buildBanned())
+    filtered = [dep for dep in dependencies if not banned(dep.requiringURL)]
+    reachable = traversefilterreachable.TraverseFilterReachable(filtered)
+    roots = []
+    for dep in filtered:
+        if dep.type in ['master', 'root'] and not banned(dep.gitURL):
+            roots.append(dep)
+            reachable.includeRecursiveByExactHashes(dep.gitURL, dep.hash)
+    return roots + list(reachable.dependencies())
+
+
+class Test(unittest.TestCase):
+    def test_OutputOrderMatchesUnindexedFilter(self):
+        dependencies = [
+            traverse.Dependency('tool', 'origin/master', 'app', 'origin/master', 'master', 'tool m', False),
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app m', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib m', False),
+            traverse.Dependency('lib', 'origin/master', 'tool', 'origin/master', 'master', 'lib m', False),
+            traverse.Dependency('other', 'origin/master', None, None, 'root', 'other m', False),
+            traverse.Dependency('lib', 'lib new', 'other', 'origin/master', 'upseto', 'lib m', False),
+            traverse.Dependency('banned', 'origin/master', None, None, 'root', 'banned m', False),
+            traverse.Dependency('lib', 'lib older', 'banned', 'origin/master', 'upseto', 'lib m', False),
+            traverse.Dependency('lib', 'origin/master', 'banned', 'origin/master', 'master', 'lib m', False),
+            traverse.Dependency('tool', 'tool old', 'lib', 'lib old', 'upseto', 'tool m', False)]
+        multiverse = FakeMultiverse(['banned'], ['app', 'lib', 'tool', 'other'])
+        traverseInstance = traverse.Traverse.fromDependencies(dependencies)
+        tested = traversefilterbuildbanned.TraverseFilterBuildBanned(multiverse, traverseInstance.index())
+        expected = unindexedBuildBanned(multiverse, dependencies)
+        self.assertEquals(tested.dependencies(), expected)
+        self.assertEquals(
+            [dep.gitURL for dep in tested.dependencies()[:4]], ['tool', 'app', 'lib', 'other'])
+
+
+if __name__ == '__main__':
+    unittest.main()
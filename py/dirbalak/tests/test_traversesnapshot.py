@@ -0,0 +1,55 @@
+import unittest
+import tempfile
+import shutil
+import os
+import simplejson
+from dirbalak import config
+from dirbalak import traverse
+from dirbalak.server import traversesnapshot
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = config.TRAVERSE_SNAPSHOT_FILENAME
+        config.TRAVERSE_SNAPSHOT_FILENAME = os.path.join(self.directory, "traverse.snapshot")
+        self.traverse = traverse.Traverse.fromDependencies([
+            traverse.Dependency('app', 'origin/master', None, None, 'root', 'app master', False),
+            traverse.Dependency('lib', 'lib old', 'app', 'origin/master', 'upseto', 'lib master', True)])
+        self.distances = dict(lib=dict(
+            masterHash='lib master', distances={'lib old': dict(broken=False, commits=3, timestamp=1000)}))
+
+    def tearDown(self):
+        config.TRAVERSE_SNAPSHOT_FILENAME = self.filename
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_RoundTrip(self):
+        traversesnapshot.save(self.traverse, self.distances)
+        loaded = traversesnapshot.load()
+        self.assertEquals(loaded.traverse().dependencies(), self.traverse.dependencies())
+        self.assertIs(loaded.traverse().dependencies()[1].broken, True)
+        self.assertEquals(loaded.distancesFromMaster(), self.distances)
+
+    def test_NoSnapshot(self):
+        self.assertIsNone(traversesnapshot.load())
+
+    def test_TruncatedSnapshot(self):
+        traversesnapshot.save(self.traverse, self.distances)
+        with open(config.TRAVERSE_SNAPSHOT_FILENAME) as f:
+            contents = f.read()
+        with open(config.TRAVERSE_SNAPSHOT_FILENAME, "w") as f:
+            f.write(contents[:len(contents) / 2])
+        self.assertIsNone(traversesnapshot.load())
+
+    def test_SnapshotOfOtherVersion(self):
+        traversesnapshot.save(self.traverse, self.distances)
+        with open(config.TRAVERSE_SNAPSHOT_FILENAME) as f:
+            data = simplejson.load(f)
+        data['version'] += 1
+        with open(config.TRAVERSE_SNAPSHOT_FILENAME, "w") as f:
+            simplejson.dump(data, f)
+        self.assertIsNone(traversesnapshot.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
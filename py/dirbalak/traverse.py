@@ -1,57 +1,77 @@
 from dirbalak import repomirrorcache
+from dirbalak import dependencyindex
+from dirbalak import dependencytable
 from upseto import gitwrapper
 import collections
 import logging
+import threading
+import multiprocessing.pool
 
 
 Dependency = collections.namedtuple(
     "Dependency", "gitURL hash requiringURL requiringURLHash type masterHash broken")
 
+_Expansion = collections.namedtuple("_Expansion", "hash masterHash broken requirements")
+
+_CONCURRENCY = 16
+_pool = None
+_poolLock = threading.Lock()
+
+
+def _threadPool():
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            _pool = multiprocessing.pool.ThreadPool(_CONCURRENCY)
+        return _pool
+
 
 class Traverse:
-    def __init__(self, visitMasterBranchOfEachDependency=True):
+    def __init__(self, visitMasterBranchOfEachDependency=True, previous=None, changedGitURLs=()):
         self._visitMasterBranchOfEachDependency = visitMasterBranchOfEachDependency
         self._visitedTuples = set()
-        self._dependencies = []
+        self._expandedNodes = set()
+        self._dependencies = dependencytable.DependencyTable(Dependency)
+        self._index = None
+        self._expansions = dict()
+        self._expansionsLock = threading.Lock()
+        self._previousExpansions = dict()
+        if previous is not None:
+            self._previousExpansions = {
+                key: expansion for key, expansion in previous._expansions.iteritems()
+                if key[0] not in changedGitURLs and expansion.ready() and expansion.successful()}
+
+    @classmethod
+    def fromDependencies(cls, dependencies):
+        result = cls()
+        for dep in dependencies:
+            result._dependencies.append(dep)
+        return result
 
     def dependencies(self):
         return self._dependencies
 
+    def index(self):
+        if self._index is None:
+            self._index = dependencyindex.DependencyIndex(self._dependencies)
+        return self._index
+
     def traverse(self, gitURL, hash):
+        self._index = None
         mirror = repomirrorcache.get(gitURL)
         hash = mirror.branchName(hash)
-        self._traverse(gitURL, hash, None, None, 'root')
+        worklist = [(self._visit, gitURL, hash, None, None, 'root')]
+        while len(worklist) > 0:
+            work = worklist.pop()
+            work[0](worklist, *work[1:])
 
-    def _traverse(self, gitURL, hash, requiringURL, requiringURLHash, type):
+    def _visit(self, worklist, gitURL, hash, requiringURL, requiringURLHash, type):
+        tuple = gitURL, hash, requiringURL, requiringURLHash
+        if tuple in self._visitedTuples:
+            return
+        self._visitedTuples.add(tuple)
         try:
-            tuple = gitURL, hash, requiringURL, requiringURLHash
-            if tuple in self._visitedTuples:
-                return
-            self._visitedTuples.add(tuple)
-
-            mirror = repomirrorcache.get(gitURL)
-            masterHash = mirror.hash('origin/master')
-            hash = mirror.branchName(hash)
-
-            broken = not mirror.hashExists(hash)
-            dep = Dependency(
-                gitURL=gitURL, hash=hash, requiringURL=requiringURL,
-                requiringURLHash=requiringURLHash, type=type, masterHash=masterHash,
-                broken=broken)
-            self._dependencies.append(dep)
-
-            if not broken:
-                upsetoManifest = mirror.upsetoManifest(hash)
-                solventManifest = mirror.solventManifest(hash)
-                basenameForBuild = self._basenameForBuild(mirror, hash)
-                for requirement in upsetoManifest.requirements():
-                    self._traverse(requirement['originURL'], requirement['hash'], gitURL, hash, 'upseto')
-                for requirement in solventManifest.requirements():
-                    basename = gitwrapper.originURLBasename(requirement['originURL'])
-                    type = 'dirbalak_build_rootfs' if basename == basenameForBuild else 'solvent'
-                    self._traverse(requirement['originURL'], requirement['hash'], gitURL, hash, type)
-            if self._visitMasterBranchOfEachDependency:
-                self._traverse(gitURL, 'origin/master', None, None, 'master')
+            expansion = self._expansion(gitURL, hash).get()
         except:
             logging.error(
                 "Exception while handling '%(gitURL)s'/%(hash)s "
@@ -59,6 +79,57 @@ class Traverse:
                     gitURL=gitURL, hash=hash, requiringURL=requiringURL, requiringURLHash=requiringURLHash,
                     type=type))
             raise
+        dep = Dependency(
+            gitURL=gitURL, hash=expansion.hash, requiringURL=requiringURL,
+            requiringURLHash=requiringURLHash, type=type, masterHash=expansion.masterHash,
+            broken=expansion.broken)
+        self._dependencies.append(dep)
+        node = gitURL, expansion.hash
+        if node in self._expandedNodes:
+            return
+        worklist.append((self._markExpanded, node))
+        if self._visitMasterBranchOfEachDependency:
+            worklist.append((self._visit, gitURL, 'origin/master', None, None, 'master'))
+        for requirementURL, requirementHash, requirementType in reversed(expansion.requirements):
+            worklist.append((
+                self._visit, requirementURL, requirementHash, gitURL, expansion.hash, requirementType))
+
+    def _markExpanded(self, worklist, node):
+        self._expandedNodes.add(node)
+
+    def _expansion(self, gitURL, hash):
+        with self._expansionsLock:
+            key = gitURL, hash
+            if key in self._previousExpansions:
+                self._expansions[key] = self._previousExpansions.pop(key)
+            elif key not in self._expansions:
+                self._expansions[key] = _threadPool().apply_async(self._expand, args=(gitURL, hash))
+            return self._expansions[key]
+
+    def _expand(self, gitURL, hash):
+        mirror = repomirrorcache.get(gitURL)
+        masterHash = mirror.hash('origin/master')
+        hash = mirror.branchName(hash)
+        broken = not mirror.hashExists(hash)
+        requirements = [] if broken else self._requirements(mirror, hash)
+        for requirementURL, requirementHash, requirementType in requirements:
+            self._expansion(requirementURL, requirementHash)
+        if self._visitMasterBranchOfEachDependency:
+            self._expansion(gitURL, 'origin/master')
+        return _Expansion(hash=hash, masterHash=masterHash, broken=broken, requirements=requirements)
+
+    def _requirements(self, mirror, hash):
+        upsetoManifest = mirror.upsetoManifest(hash)
+        solventManifest = mirror.solventManifest(hash)
+        basenameForBuild = self._basenameForBuild(mirror, hash)
+        result = []
+        for requirement in upsetoManifest.requirements():
+            result.append((requirement['originURL'], requirement['hash'], 'upseto'))
+        for requirement in solventManifest.requirements():
+            basename = gitwrapper.originURLBasename(requirement['originURL'])
+            type = 'dirbalak_build_rootfs' if basename == basenameForBuild else 'solvent'
+            result.append((requirement['originURL'], requirement['hash'], type))
+        return result
 
     def _basenameForBuild(self, mirror, hash):
         try:
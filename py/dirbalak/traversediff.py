@@ -0,0 +1,68 @@
+class TraverseDiff:
+    def __init__(self, previous, current):
+        previousDependencies = [] if previous is None else previous.dependencies()
+        previousEdges = self._edges(previousDependencies)
+        currentEdges = self._edges(current.dependencies())
+        self._addedEdges = [edge for key, edge in currentEdges.iteritems() if key not in previousEdges]
+        self._removedEdges = [edge for key, edge in previousEdges.iteritems() if key not in currentEdges]
+        previousMasters = self._masters(previousDependencies)
+        currentMasters = self._masters(current.dependencies())
+        self._changedMasterHashes = {
+            gitURL: (previousMasters.get(gitURL, None), currentMasters.get(gitURL, None))
+            for gitURL in set(previousMasters) | set(currentMasters)
+            if previousMasters.get(gitURL, None) != currentMasters.get(gitURL, None)}
+        previousBroken = self._broken(previousDependencies)
+        currentBroken = self._broken(current.dependencies())
+        self._broke = self._flipped(previousBroken, currentBroken, True)
+        self._repaired = self._flipped(previousBroken, currentBroken, False)
+
+    def addedEdges(self):
+        return self._addedEdges
+
+    def removedEdges(self):
+        return self._removedEdges
+
+    def changedMasterHashes(self):
+        return self._changedMasterHashes
+
+    def broke(self):
+        return self._broke
+
+    def repaired(self):
+        return self._repaired
+
+    def empty(self):
+        return not (
+            self._addedEdges or self._removedEdges or self._changedMasterHashes or
+            self._broke or self._repaired)
+
+    def asDict(self):
+        return dict(
+            addedEdges=[self._edgeAsDict(edge) for edge in self._addedEdges],
+            removedEdges=[self._edgeAsDict(edge) for edge in self._removedEdges],
+            changedMasterHashes=[
+                dict(gitURL=gitURL, previous=previous, current=current)
+                for gitURL, (previous, current) in self._changedMasterHashes.iteritems()],
+            broke=[dict(gitURL=gitURL, hash=hash) for gitURL, hash in self._broke],
+            repaired=[dict(gitURL=gitURL, hash=hash) for gitURL, hash in self._repaired])
+
+    def _edges(self, dependencies):
+        return {
+            (dep.gitURL, dep.hash, dep.requiringURL, dep.requiringURLHash, dep.type): dep
+            for dep in dependencies if dep.requiringURL is not None}
+
+    def _masters(self, dependencies):
+        return {dep.gitURL: dep.masterHash for dep in dependencies}
+
+    def _broken(self, dependencies):
+        return {(dep.gitURL, dep.hash): dep.broken for dep in dependencies}
+
+    def _flipped(self, previousBroken, currentBroken, broken):
+        return [
+            node for node, value in currentBroken.iteritems()
+            if value == broken and previousBroken.get(node, False) != broken]
+
+    def _edgeAsDict(self, edge):
+        return dict(
+            gitURL=edge.gitURL, hash=edge.hash, requiringURL=edge.requiringURL,
+            requiringURLHash=edge.requiringURLHash, type=edge.type)
@@ -3,9 +3,12 @@ class TraverseFilter:
         self._traverse = traverse
         self._dirbalakBuildRootFSArcs = dirbalakBuildRootFSArcs
         self._solventRootFSArcs = solventRootFSArcs
+        self._dependencies = None
 
     def dependencies(self):
-        return [d for d in self._traverse.dependencies() if not self._skip(d)]
+        if self._dependencies is None:
+            self._dependencies = self._traverse.dependencies().filter(lambda d: not self._skip(d))
+        return self._dependencies
 
     def _skip(self, dep):
         if not self._dirbalakBuildRootFSArcs:
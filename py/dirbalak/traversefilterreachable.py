@@ -1,28 +1,42 @@
 from upseto import gitwrapper
+from dirbalak import dependencyindex
+import collections
 
 
 class TraverseFilterReachable:
     def __init__(self, dependencies):
-        self._dependencies = dependencies
+        self._basenames = dict()
+        self._adjacency = self._makeAdjacency(dependencyindex.DependencyIndex(dependencies))
         self._filtered = set()
         self._reachableHashes = set()
 
     def includeRecursiveByExactHashes(self, url, hash):
-        basename = gitwrapper.originURLBasename(url)
-        self._reachableHashes.add((basename, hash))
-        while True:
-            before = len(self._reachableHashes)
-            for dependency in self._dependencies:
-                if dependency.requiringURL is None:
-                    continue
-                basename = gitwrapper.originURLBasename(dependency.requiringURL)
-                exact = (basename, dependency.requiringURLHash)
-                if exact in self._reachableHashes:
-                    self._filtered.add(dependency)
-                    basename = gitwrapper.originURLBasename(dependency.gitURL)
-                    self._reachableHashes.add((basename, dependency.hash))
-            if len(self._reachableHashes) == before:
-                break
+        root = (self._basename(url), hash)
+        if root in self._reachableHashes:
+            return
+        self._reachableHashes.add(root)
+        worklist = collections.deque([root])
+        while len(worklist) > 0:
+            for dependency, reached in self._adjacency.get(worklist.popleft(), []):
+                self._filtered.add(dependency)
+                if reached not in self._reachableHashes:
+                    self._reachableHashes.add(reached)
+                    worklist.append(reached)
 
     def dependencies(self):
         return self._filtered
+
+    def _makeAdjacency(self, index):
+        adjacency = dict()
+        for requiringURL, requiringURLHash in index.requirers():
+            if requiringURL is None:
+                continue
+            arcs = adjacency.setdefault((self._basename(requiringURL), requiringURLHash), [])
+            for dependency in index.dependenciesOf(requiringURL, requiringURLHash):
+                arcs.append((dependency, (self._basename(dependency.gitURL), dependency.hash)))
+        return adjacency
+
+    def _basename(self, url):
+        if url not in self._basenames:
+            self._basenames[url] = gitwrapper.originURLBasename(url)
+        return self._basenames[url]
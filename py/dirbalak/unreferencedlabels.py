@@ -13,8 +13,11 @@ class UnreferencedLabels:
         self._references = set()
         self._traverse = traverse.Traverse()
         for project in projects:
-            for dependency in self._traverse.traverse(project, 'origin/master'):
-                self._addReferencesFromManifests(dependency)
+            self._traverse.traverse(project, 'origin/master')
+        for dependency in self._traverse.dependencies():
+            if dependency.broken:
+                continue
+            self._addReferencesFromManifests(dependency)
 
         self._unreferenced = []
         for label in self._labels: